@@ -14,66 +14,1491 @@ OTHER_AGENT = 7
 TRAINING_MODE = 5
 PLAYING_MODE = 6
 
+# Exploration strategies of RLPlayer in training mode
+EXPLORE_EPSILON = 10
+EXPLORE_DECAYING_EPSILON = 11
+EXPLORE_UCB = 12
+
+POLICY_FILE = 'cse_policy_hw2.txt'
+
+FORFEIT_LOSS = 8
+FORFEIT_IGNORE = 9
+
+# Rewards of a finished game for the RL agent
+WIN_REWARD = 22
+LOSS_REWARD = -22
+DRAW_REWARD = 4
+
+# Fraction of a move's time budget handed to anytime agents, leaving
+# headroom for the time it takes them to notice the deadline
+TIME_BUDGET_SAFETY = 0.9
+
+import array
+import bisect
+import collections
+import copy
+import csv
+import functools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import queue
 import random
+import threading
+import time
 
 RANDOM_NUMBER_SEED = 795623
 random.seed(RANDOM_NUMBER_SEED)
 
+WINNING_LINES = [
+    [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Horizontal lines
+    [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Vertical lines
+    [0, 4, 8], [2, 4, 6]  # Diagonal lines
+]
+
+# The winning lines that go through each square
+LINES_THROUGH = [[line for line in WINNING_LINES if square in line] for square in range(9)]
+
+# Keys read as base 3 numbers ('*' = 0, 'L' = 1, 'T' = 2) give every
+# state an id below STATE_COUNT, used to index compact arrays
+STATE_COUNT = 3 ** 9
+KEY_DIGITS = str.maketrans('*LT', '012')
+SWAP_SIDES = str.maketrans('LT', 'TL')
+
 
 def createPlayer(letter, playerType=RANDOM_AGENT):
     """
 	This function creates a player object
 
-	param letter: A string; single character, e.g., 'X' or 'O'
-	param playerType: Integer, RL_AGENT or HUMAN_AGENT
-	"""
-    if playerType == RL_AGENT:
-        return RLPlayer(letter)
-    elif playerType == HUMAN_AGENT:
-        return HUMANPlayer(letter)
+	param letter: A string; single character, e.g., 'X' or 'O'
+	param playerType: Integer, RL_AGENT or HUMAN_AGENT
+	"""
+    if playerType == RL_AGENT:
+        return RLPlayer(letter)
+    elif playerType == HUMAN_AGENT:
+        return HUMANPlayer(letter)
+
+    return Player(letter, playerType)
+
+
+def stateId(key):
+    """
+	This function returns the id of a state key
+
+	param key: String, a key as returned by TicTacToe.getKey
+	return: Integer (0..STATE_COUNT-1)
+	"""
+    return int(key.translate(KEY_DIGITS), 3)
+
+
+def stateKey(state):
+    """
+	This function returns the key of a state id
+
+	param state: Integer, a state id
+	return: String, 9 characters long, of Ls, Ts and *s
+	"""
+    key = []
+    for _ in range(9):
+        state, digit = divmod(state, 3)
+        key.append('*LT'[digit])
+    return ''.join(reversed(key))
+
+
+def newVisitCounts():
+    """
+	This function returns a zeroed array of visit counts, one unsigned
+	32 bit counter per state id
+
+	return: array.array
+	"""
+    return array.array('I', [0]) * STATE_COUNT
+
+
+def visitCountsToDict(visitCounts):
+    """
+	This function returns the non-zero visit counts keyed by state key,
+	the form in which checkpoints store them
+
+	param visitCounts: array.array, see newVisitCounts
+	return: Dictionary
+	"""
+    return {stateKey(state): count for state, count in enumerate(visitCounts) if count}
+
+
+def visitCountsFromDict(counts):
+    """
+	This function is the inverse of visitCountsToDict
+
+	param counts: Dictionary {key: count}
+	return: array.array
+	"""
+    visitCounts = newVisitCounts()
+    for key, count in counts.items():
+        visitCounts[stateId(key)] = count
+    return visitCounts
+
+
+def keyWinner(key):
+    """
+	This function returns who has won the game a key describes
+
+	param key: String, a state key
+	return: String, 'L', 'T', or None if neither has won
+	"""
+    for a, b, c in WINNING_LINES:
+        if key[a] != '*' and key[a] == key[b] == key[c]:
+            return key[a]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def reachableKeys():
+    """
+	This function enumerates the keys of every state that can occur in
+	a game, from the perspective of either player. The result is
+	computed once and cached.
+
+	return: Tuple of Strings
+	"""
+    keys = set()
+    stack = ['*********']
+    seen = {'*********'}
+
+    while stack:
+        board = stack.pop()
+        keys.add(board.replace('X', 'L').replace('O', 'T'))
+        keys.add(board.replace('O', 'L').replace('X', 'T'))
+
+        if keyWinner(board) is not None or '*' not in board:
+            continue
+
+        mark = 'X' if board.count('X') == board.count('O') else 'O'
+        for location in range(9):
+            if board[location] == '*':
+                child = board[:location] + mark + board[location + 1:]
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+
+    return tuple(sorted(keys))
+
+
+def isAfterstate(key):
+    """
+	This function tells whether a key can be the state right after a
+	move of the agent (L), i.e. with the opponent (T) to move
+
+	param key: String
+	return: Boolean
+	"""
+    own = key.count('L')
+    return own > 0 and key.count('T') in (own - 1, own)
+
+
+@functools.lru_cache(maxsize=None)
+def solvedValue(key):
+    """
+	This function solves an afterstate exactly: the result of the game
+	for the agent (L) when both players play perfectly from it, with
+	the opponent (T) to move. Results are cached.
+
+	param key: String, an afterstate key
+	return: Integer, 1 for a win, 0 for a draw, -1 for a loss
+	"""
+    winner = keyWinner(key)
+    if winner is not None:
+        return 1 if winner == 'L' else -1
+    if '*' not in key:
+        return 0
+
+    # The opponent picks the move that is best from its own perspective
+    swapped = key.translate(SWAP_SIDES)
+    best = -1
+    for location in range(9):
+        if key[location] == '*':
+            best = max(best, solvedValue(swapped[:location] + 'L' + swapped[location + 1:]))
+            if best == 1:
+                break
+    return -best
+
+
+def compactTable(valueFunction, dropTerminal=False):
+    """
+	This function prunes a value table to the entries that matter: the
+	reachable afterstates whose value was actually updated away from
+	the default 0, and the afterstates that end a game, whatever their
+	value, so an agent in the default mode still finds its immediate
+	wins. With dropTerminal those are dropped as well; such a table
+	must be played in sparse mode (see RLPlayer.setSparse), which
+	values them by their reward.
+
+	param valueFunction: Dictionary {key: value}
+	param dropTerminal: Boolean, drop the afterstates that end a game
+	return: Dictionary, the compacted table
+	"""
+    scheme = defaultRewardScheme()
+    reachable = set(reachableKeys())
+    compacted = {}
+
+    for key, value in valueFunction.items():
+        if key not in reachable or not isAfterstate(key):
+            continue
+        if scheme.terminal[stateId(key)]:
+            if dropTerminal:
+                continue
+        elif value == 0:
+            continue
+        compacted[key] = value
+
+    return compacted
+
+
+def get_current_row():
+    """
+    This function returns the number of the episode
+    """
+
+
+def train(player1, player2, episodes, metrics=None, earlyStopping=None, evaluator=None,
+          checkpointer=None, resume=None, opponentModel=None):
+    """
+	This function executes n (as specified by episodes) tictactoe games
+
+	param player1: A Player object
+	param player2: A Player object
+	param episodes: Number of tictactoe games to play for training
+	param metrics: MetricsLogger object or None, receives the result
+			of every episode
+	param earlyStopping: EarlyStopping object or None, ends training
+			once the value table has converged
+	param evaluator: SnapshotEvaluator object or None, evaluates
+			snapshots of the value table in the background
+	param checkpointer: Checkpointer object or None, writes checkpoints
+			during training
+	param resume: String or None, checkpoint to continue from; the
+			episodes it already played are not played again
+	param opponentModel: OpponentModel object or None, records the
+			moves of the RL agent's opponent
+	return: Integer, the number of episodes actually played
+	"""
+    rlplayer = player1 if player1.getType() == RL_AGENT else player2
+    played = 0
+    start = 0
+
+    if resume is not None:
+        start = loadCheckpoint(resume, rlplayer)
+
+    for i in range(start, episodes):
+        board = TicTacToe()
+        board.setPlayers(player1, player2)
+        runEpisode(board, opponentModel)
+        played += 1
+
+        if metrics is not None:
+            metrics.record(board, rlplayer)
+
+        if evaluator is not None:
+            evaluator.record(rlplayer)
+
+        if checkpointer is not None:
+            checkpointer.record(i + 1, rlplayer)
+
+        if earlyStopping is not None and earlyStopping.record(board, rlplayer):
+            break
+
+    if checkpointer is not None:
+        checkpointer.write(start + played, rlplayer)
+
+    if PROFILER.enabled:
+        PROFILER.export()
+
+    return played
+
+
+class Checkpointer:
+    """
+	This class writes training checkpoints every 'everyEpisodes'
+	episodes and/or every 'everySeconds' seconds. A checkpoint holds the
+	value table, visit counts, hyper-parameters, episode index and the
+	state of the random number generator, so train(..., resume=path)
+	continues exactly where the checkpoint was taken. Checkpoints are
+	written to a temporary file which then replaces the previous one, so
+	a crash never leaves a half-written checkpoint behind.
+
+	With compactEvery set, the value table is kept out of the checkpoint
+	file: only the states changed since the previous checkpoint are
+	appended to a delta log, and every compactEvery checkpoints the log
+	is compacted into a new full snapshot of the table. The checkpoint
+	file records which snapshot and how much of the log belong to it.
+	If the checkpoint file already exists, e.g. when a run is resumed
+	from it, the first write starts a new snapshot generation, so the
+	files the existing checkpoint refers to are never overwritten.
+	"""
+
+    def __init__(self, path, everyEpisodes=None, everySeconds=None, compactEvery=None):
+        """
+		param path: String, the checkpoint file
+		param everyEpisodes: Integer or None
+		param everySeconds: Float or None
+		param compactEvery: Integer or None, checkpoints between two full
+				snapshots of the value table; None writes the whole table
+				into every checkpoint
+		"""
+
+        self.path = path
+        self.everyEpisodes = everyEpisodes
+        self.everySeconds = everySeconds
+        self.compactEvery = compactEvery
+        self.lastWrite = time.monotonic()
+        self.generation = None
+        self.deltas = 0
+        self.deltaBytes = 0
+
+        if compactEvery is not None and os.path.exists(path):
+            with open(path) as data:
+                table = json.load(data).get('table')
+            if table is not None:
+                # Continue after the existing checkpoint's generation
+                self.generation = table['generation']
+                self.deltas = compactEvery
+
+    def record(self, episode, rlplayer):
+        """
+		Writes a checkpoint if one is due.
+
+		param episode: Integer, episodes completed so far
+		param rlplayer: RLPlayer object
+		"""
+
+        if self.everyEpisodes is not None and episode % self.everyEpisodes == 0:
+            self.write(episode, rlplayer)
+        elif self.everySeconds is not None and time.monotonic() - self.lastWrite >= self.everySeconds:
+            self.write(episode, rlplayer)
+
+    def write(self, episode, rlplayer):
+        """
+		Writes a checkpoint atomically.
+
+		param episode: Integer, episodes completed so far
+		param rlplayer: RLPlayer object
+		"""
+
+        checkpoint = {
+            'episode': episode,
+            'letter': rlplayer.letter,
+            'learningRate': rlplayer.learningRate,
+            'discountRate': rlplayer.discountRate,
+            'epsilon': rlplayer.epsilon,
+            'mode': rlplayer.mode,
+            'exploration': [rlplayer.exploration, rlplayer.ucbConstant, rlplayer.epsilonDecay,
+                            rlplayer.learningRateByVisits],
+            'rngState': random.getstate(),
+        }
+
+        if self.compactEvery is None:
+            checkpoint['visitCounts'] = visitCountsToDict(rlplayer.visitCounts)
+            checkpoint['valueFunction'] = rlplayer.valueFunction
+        else:
+            checkpoint['table'] = self.writeTable(rlplayer)
+
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as out:
+            json.dump(checkpoint, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, self.path)
+
+        if self.compactEvery is not None and self.deltas == 0:
+            # The checkpoint now refers to the new snapshot
+            self.removeStaleTables()
+
+        rlplayer.dirty.clear()
+        self.lastWrite = time.monotonic()
+
+    def removeStaleTables(self):
+        """
+		Deletes the snapshots and delta logs, including half-written
+		ones, of every generation but the current one.
+		"""
+
+        directory = os.path.dirname(self.path) or '.'
+        base = os.path.basename(self.path)
+        current = {os.path.basename(tableFileName(self.path, self.generation)),
+                   os.path.basename(deltaFileName(self.path, self.generation))}
+
+        for name in os.listdir(directory):
+            if name.startswith((base + '.table.', base + '.delta.')) and name not in current:
+                os.remove(os.path.join(directory, name))
+
+    def writeTable(self, rlplayer):
+        """
+		Writes the value table as a full snapshot, when one is due, or
+		appends the states changed since the last checkpoint to the
+		delta log.
+
+		param rlplayer: RLPlayer object
+		return: Dictionary, where the table is stored
+		"""
+
+        if self.generation is None or self.deltas >= self.compactEvery:
+            self.generation = 0 if self.generation is None else self.generation + 1
+            self.deltas = 0
+            self.deltaBytes = 0
+
+            temporary = tableFileName(self.path, self.generation) + '.tmp'
+            with open(temporary, 'w') as out:
+                for key, value in rlplayer.valueFunction.items():
+                    out.write(f'{key}:{value!r}:{rlplayer.visitCounts[stateId(key)]}\n')
+                # Played states may have no value yet
+                for key, count in visitCountsToDict(rlplayer.visitCounts).items():
+                    if key not in rlplayer.valueFunction:
+                        out.write(f'{key}::{count}\n')
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temporary, tableFileName(self.path, self.generation))
+            open(deltaFileName(self.path, self.generation), 'w').close()
+        else:
+            with open(deltaFileName(self.path, self.generation), 'a') as out:
+                for key in rlplayer.dirty:
+                    # Played states may have no value yet
+                    value = rlplayer.valueFunction.get(key)
+                    value = '' if value is None else repr(value)
+                    out.write(f'{key}:{value}:{rlplayer.visitCounts[stateId(key)]}\n')
+                out.flush()
+                os.fsync(out.fileno())
+                self.deltaBytes = out.tell()
+            self.deltas += 1
+
+        return {'generation': self.generation, 'deltaBytes': self.deltaBytes}
+
+
+def tableFileName(path, generation):
+    """
+	Returns the name of a checkpoint's full value table snapshot
+	"""
+    return f'{path}.table.{generation}'
+
+
+def deltaFileName(path, generation):
+    """
+	Returns the name of a checkpoint's delta log
+	"""
+    return f'{path}.delta.{generation}'
+
+
+def readTable(path, generation, deltaBytes):
+    """
+	This function rebuilds a value table and its visit counts from a
+	snapshot and the part of its delta log that belongs to a checkpoint.
+	Anything appended to the log after the checkpoint was written is
+	ignored.
+
+	param path: String, the checkpoint file
+	param generation: Integer, the snapshot generation
+	param deltaBytes: Integer, length of the delta log at the checkpoint
+	return: Tuple (valueFunction, {key: visit count})
+	"""
+
+    valueFunction = {}
+    visitCounts = {}
+
+    with open(tableFileName(path, generation)) as snapshot:
+        lines = snapshot.read().splitlines()
+
+    with open(deltaFileName(path, generation)) as deltas:
+        lines += deltas.read(deltaBytes).splitlines()
+
+    for line in lines:
+        key, value, count = line.split(':')
+        if value:
+            valueFunction[key] = float(value)
+        if int(count):
+            visitCounts[key] = int(count)
+
+    return valueFunction, visitCounts
+
+
+def loadCheckpoint(path, rlplayer):
+    """
+	This function restores an RL agent and the random number generator
+	from a checkpoint written by a Checkpointer.
+
+	param path: String, the checkpoint file
+	param rlplayer: RLPlayer object
+	return: Integer, the number of episodes the checkpoint had completed
+	"""
+
+    with open(path) as data:
+        checkpoint = json.load(data)
+
+    rlplayer.learningRate = checkpoint['learningRate']
+    rlplayer.discountRate = checkpoint['discountRate']
+    rlplayer.epsilon = checkpoint['epsilon']
+    rlplayer.mode = checkpoint['mode']
+
+    if 'table' in checkpoint:
+        table = checkpoint['table']
+        rlplayer.valueFunction, visitCounts = readTable(path, table['generation'], table['deltaBytes'])
+    else:
+        visitCounts = checkpoint['visitCounts']
+        rlplayer.valueFunction = checkpoint['valueFunction']
+    rlplayer.visitCounts = visitCountsFromDict(visitCounts)
+    rlplayer.dirty.clear()
+
+    # Checkpoints written before count based exploration have no settings
+    if 'exploration' in checkpoint:
+        rlplayer.setExploration(*checkpoint['exploration'])
+
+    version, state, gauss = checkpoint['rngState']
+    random.setstate((version, tuple(state), gauss))
+
+    return checkpoint['episode']
+
+
+class SnapshotEvaluator:
+    """
+	This class evaluates snapshots of an RL agent's value table while
+	training continues. Every 'every' episodes the table is distilled
+	into its greedy policy (see RLPlayer.exportPolicy), which is played
+	against each opponent, in both seats, by a worker process.
+	Results arrive in the background and build up a learning curve keyed
+	by episode number. Use it as a context manager so the worker pool is
+	always shut down; the curve is complete once the block is left:
+
+		with SnapshotEvaluator([('Random', Player)]) as evaluator:
+			train(agent, partner, 50000, evaluator=evaluator)
+		curve = evaluator.curve
+	"""
+
+    def __init__(self, opponents, games=100, every=5000, processes=1, output=None):
+        """
+		param opponents: List of (name, Player class) pairs; the classes
+				are created in the worker with a letter, e.g. WinSeekingBot
+		param games: Integer, games per opponent and seat
+		param every: Integer, training episodes between two snapshots
+		param processes: Integer, number of evaluation processes
+		param output: String or None, JSON lines file the results are
+				appended to as they arrive
+		"""
+
+        self.opponents = opponents
+        self.games = games
+        self.every = every
+        self.processes = processes
+        self.output = output
+        self.episode = 0
+        self.curve = {}
+        self.pool = None
+        self.pending = []
+
+        if output:
+            open(output, 'w').close()
+
+    def record(self, rlplayer):
+        """
+		Counts a training episode and takes a snapshot every 'every'
+		episodes.
+
+		param rlplayer: RLPlayer object
+		"""
+
+        self.episode += 1
+        if self.episode % self.every == 0:
+            self.snapshot(rlplayer)
+
+    def snapshot(self, rlplayer):
+        """
+		Exports the greedy policy and sends it off for evaluation.
+
+		param rlplayer: RLPlayer object
+		"""
+
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.processes)
+
+        task = (self.episode, rlplayer.exportPolicy(), self.opponents, self.games)
+        self.pending.append(self.pool.apply_async(evaluateSnapshot, task, callback=self.collect))
+
+    def collect(self, result):
+        """
+		Stores the result of an evaluation. Runs in the pool's result
+		thread.
+
+		param result: Tuple (episode, Dictionary of results per opponent)
+		"""
+
+        episode, results = result
+        self.curve[episode] = results
+
+        if self.output:
+            with open(self.output, 'a') as out:
+                out.write(json.dumps({'episode': episode, 'results': results}) + '\n')
+
+    def close(self):
+        """
+		Waits for the outstanding evaluations and stops the workers.
+
+		return: Dictionary, the learning curve {episode: results}
+		"""
+
+        for job in self.pending:
+            job.get()
+        self.pending = []
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        self.curve = dict(sorted(self.curve.items()))
+        return self.curve
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None and self.pool is not None:
+            # Do not wait for evaluations nobody will look at
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.pending = []
+        self.close()
+
+
+def evaluateSnapshot(episode, policy, opponents, games):
+    """
+	This function plays a snapshot of the agent's greedy policy against
+	each opponent in both seats; it runs in a SnapshotEvaluator worker
+	process.
+
+	param episode: Integer, the training episode of the snapshot
+	param policy: array.array, the snapshot (see RLPlayer.exportPolicy)
+	param opponents: List of (name, Player class) pairs
+	param games: Integer, games per opponent and seat
+	return: Tuple (episode, {name: {'won', 'drawn', 'lost', 'score'}})
+	"""
+
+    # Seed by episode so results do not depend on the order of the jobs
+    random.seed(episode)
+    results = {}
+
+    for name, opponentClass in opponents:
+        first = PolicyPlayer('X', policy)
+        second = PolicyPlayer('O', policy)
+
+        tournament = Tournament()
+        tournament.start(first, opponentClass('O'), games)
+        tournament.start(opponentClass('X'), second, games)
+
+        won = first.gamesW + second.gamesW
+        drawn = first.gamesD + second.gamesD
+        lost = first.gamesL + second.gamesL
+        results[name] = {'won': won, 'drawn': drawn, 'lost': lost,
+                         'score': (won + 0.5 * drawn) / (2 * games)}
+
+    return episode, results
+
+
+class EarlyStopping:
+    """
+	This class detects when training has converged. Training episodes
+	are grouped into windows; a window has plateaued when the largest
+	and the mean absolute change of the value table during the window
+	are below their thresholds and, optionally, the win rate moved by
+	less than winRateTolerance since the previous window. Training stops
+	after 'patience' plateaued windows in a row.
+	"""
+
+    def __init__(self, window=1000, maxChange=0.01, meanChange=0.001, winRateTolerance=None, patience=1):
+        """
+		param window: Integer, episodes per window
+		param maxChange: Float, threshold for the largest value change
+		param meanChange: Float, threshold for the mean value change
+		param winRateTolerance: Float or None, allowed change of the win
+				rate between windows; None ignores the win rate
+		param patience: Integer, plateaued windows needed to stop
+		"""
+
+        self.window = window
+        self.maxChange = maxChange
+        self.meanChange = meanChange
+        self.winRateTolerance = winRateTolerance
+        self.patience = patience
+
+        self.episodes = 0
+        self.stoppedAt = None
+        self.plateaus = 0
+        self.previousWinRate = None
+        self.resetWindow()
+
+    def resetWindow(self):
+        """
+		Clears the statistics of the current window.
+		"""
+
+        self.windowMax = 0.0
+        self.windowSum = 0.0
+        self.windowWins = 0
+        self.windowEpisodes = 0
+
+    def record(self, board, rlplayer):
+        """
+		Records a finished episode.
+
+		param board: TicTacToe object, the finished game
+		param rlplayer: RLPlayer object
+		return: True if training should stop, otherwise False
+		"""
+
+        change = abs(rlplayer.valueChange)
+        self.windowMax = max(self.windowMax, change)
+        self.windowSum += change
+        self.windowEpisodes += 1
+        self.episodes += 1
+        if board.isGameWon(rlplayer.letter):
+            self.windowWins += 1
+
+        if self.windowEpisodes < self.window:
+            return False
+
+        winRate = self.windowWins / self.windowEpisodes
+        plateau = self.windowMax < self.maxChange and self.windowSum / self.windowEpisodes < self.meanChange
+
+        if self.winRateTolerance is not None:
+            plateau = plateau and self.previousWinRate is not None \
+                      and abs(winRate - self.previousWinRate) < self.winRateTolerance
+
+        self.plateaus = self.plateaus + 1 if plateau else 0
+        self.previousWinRate = winRate
+        self.resetWindow()
+
+        if self.plateaus >= self.patience:
+            self.stoppedAt = self.episodes
+            return True
+
+        return False
+
+
+class Curriculum:
+    """
+	This class schedules the opponents of a training run. Opponents are
+	drawn from a weighted pool; the weight of an opponent grows with the
+	share of the last 'window' games the agent did not win against it,
+	so training goes where the agent still loses. An opponent is
+	mastered, and leaves the pool, once the agent's rolling score
+	against it reaches 'mastery'. With poolSize set, only that many
+	opponents are in the pool at once and the next opponent of the list
+	takes the place of a mastered one, so the curriculum escalates.
+	"""
+
+    def __init__(self, opponents, window=500, mastery=0.9, drawScore=1.0, minWeight=0.05, poolSize=None):
+        """
+		param opponents: List of Player objects, playing the letter of
+				the agent's opponent, easiest first
+		param window: Integer, games per opponent the rolling score
+				is computed over
+		param mastery: Float (0..1), rolling score at which an opponent
+				is mastered
+		param drawScore: Float (0..1), score of a draw; the default
+				counts a draw as mastered play, which is the best
+				result against minAndMAx
+		param minWeight: Float, weight an opponent keeps at a perfect
+				rolling score
+		param poolSize: Integer or None, opponents in the pool at once;
+				None puts all of them in the pool
+		"""
+
+        self.window = window
+        self.mastery = mastery
+        self.drawScore = drawScore
+        self.minWeight = minWeight
+
+        self.queue = list(opponents)
+        self.pool = []
+        self.results = {}
+        self.games = {}
+        self.mastered = []
+        self.episodes = 0
+
+        for _ in range(len(self.queue) if poolSize is None else poolSize):
+            self.promote()
+
+    def promote(self):
+        """
+		Moves the next opponent of the list into the pool.
+		"""
+
+        if self.queue:
+            opponent = self.queue.pop(0)
+            self.pool.append(opponent)
+            self.results[opponent] = collections.deque(maxlen=self.window)
+            self.games[opponent] = 0
+
+    def finished(self):
+        """
+		return: True once every opponent has been mastered
+		"""
+
+        return not self.pool
+
+    def score(self, opponent):
+        """
+		Returns the agent's rolling score against an opponent, 0 before
+		the first game.
+
+		param opponent: Player object
+		return: Float (0..1)
+		"""
+
+        results = self.results[opponent]
+        return sum(results) / len(results) if results else 0.0
+
+    def weights(self):
+        """
+		return: List of Floats, the sampling weight of each opponent in
+				the pool
+		"""
+
+        return [self.minWeight + 1.0 - self.score(opponent) for opponent in self.pool]
+
+    def sample(self):
+        """
+		Draws the opponent of the next episode.
+
+		return: Player object, or None once every opponent is mastered
+		"""
+
+        if not self.pool:
+            return None
+        return random.choices(self.pool, self.weights())[0]
+
+    def record(self, opponent, board, rlplayer):
+        """
+		Records a finished episode against an opponent and retires the
+		opponent once it is mastered.
+
+		param opponent: Player object
+		param board: TicTacToe object, the finished game
+		param rlplayer: RLPlayer object
+		"""
+
+        if board.isGameWon(rlplayer.letter):
+            result = 1.0
+        elif board.isGameWon(rlplayer.opponent):
+            result = 0.0
+        else:
+            result = self.drawScore
+
+        results = self.results[opponent]
+        results.append(result)
+        self.games[opponent] += 1
+        self.episodes += 1
+
+        if len(results) == self.window and self.score(opponent) >= self.mastery:
+            self.pool.remove(opponent)
+            self.mastered.append((opponent, self.episodes))
+            self.promote()
+
+    def printStats(self):
+        """
+		Prints the games played and the rolling score per opponent.
+		"""
+
+        masteredAt = {opponent: episode for opponent, episode in self.mastered}
+        for opponent in self.results:
+            status = f'mastered after {masteredAt[opponent]} episodes' if opponent in masteredAt else 'in pool'
+            print(f'{opponent.name:<20} games = {self.games[opponent]:<8} '
+                  f'score = {self.score(opponent):.3f}  {status}')
+
+
+def trainCurriculum(rlplayer, curriculum, episodes, seat='both', metrics=None):
+    """
+	This function executes up to n (as specified by episodes) tictactoe
+	games against opponents drawn from a curriculum, and stops early
+	once every opponent has been mastered.
+
+	param rlplayer: RLPlayer object
+	param curriculum: Curriculum object
+	param episodes: Number of tictactoe games to play for training
+	param seat: String, 'first', 'second' or 'both' (alternating)
+	param metrics: MetricsLogger object or None, receives the result
+			of every episode
+	return: Integer, the number of episodes actually played
+	"""
+
+    played = 0
+
+    for i in range(episodes):
+        opponent = curriculum.sample()
+        if opponent is None:
+            break
+
+        board = TicTacToe()
+        if seat == 'first' or (seat == 'both' and i % 2 == 0):
+            board.setPlayers(rlplayer, opponent)
+        else:
+            board.setPlayers(opponent, rlplayer)
+        runEpisode(board)
+        played += 1
+
+        curriculum.record(opponent, board, rlplayer)
+        if metrics is not None:
+            metrics.record(board, rlplayer)
+
+    if PROFILER.enabled:
+        PROFILER.export()
+
+    return played
+
+
+def trainShared(learners, opponent, episodes, seat='both'):
+    """
+	This function executes n (as specified by episodes) tictactoe games
+	against one opponent and updates several value tables from the same
+	games. The first learner plays the games, with its epsilon; every
+	learner learns from the first learner's afterstates with its own
+	learning and discount rate and the rewards of its own reward
+	scheme, so a game is simulated once for all of them.
+
+	param learners: List of RLPlayer objects, in training mode
+	param opponent: A Player object
+	param episodes: Number of tictactoe games to play for training
+	param seat: String, 'first', 'second' or 'both' (alternating)
+	return: Integer, the number of episodes played
+	"""
+
+    actor = learners[0]
+
+    for i in range(episodes):
+        if seat == 'first' or (seat == 'both' and i % 2 == 0):
+            winner, trajectories = selfPlayEpisode(actor, opponent)
+        else:
+            winner, trajectories = selfPlayEpisode(opponent, actor)
+
+        key = finalKey(trajectories, winner.letter if winner else None, actor.letter)
+        keys = trajectories[actor.letter]
+        for learner in learners:
+            scheme = learner.rewardScheme or defaultRewardScheme()
+            learner.learnFromTrajectory(keys, scheme.reward(key))
+
+    return episodes
+
+
+def runEpisode(board, opponentModel=None):
+    """
+	This function executes a single tictactoe game and updates
+	the state value table after every move played by the RL agent.
+	The afterstates the RL agent plays are counted in its visit
+	counts (see RLPlayer.countVisit).
+	:param: board: A TicTacToe object
+	:param: opponentModel: OpponentModel object or None, records the
+			moves of the RL agent's opponent
+	"""
+
+    players = board.getPlayers()
+    rlplayer = players[0]
+
+    if not rlplayer.getType() == RL_AGENT:
+        rlplayer = players[1]
+
+    if PROFILER.enabled:
+        PROFILER.beginEpisode()
+
+    rlplayer.previousState = board.copy()
+    while not board.isGameOver():
+        player = board.next()
+        watched = opponentModel is not None and player is not rlplayer
+        if watched:
+            key = board.getKey(rlplayer.letter)
+
+        if PROFILER.sampling:
+            phase = 'rlMove' if player is rlplayer else 'opponentMove'
+            PROFILER.call(phase, player.makeMove, board)
+        else:
+            player.makeMove(board)
+
+        if watched:
+            opponentModel.observe(key, board.lastMove)
+        elif player is rlplayer:
+            rlplayer.countVisit(board.getKey(rlplayer.letter))
+
+    rlplayer.rewardState(board)
+
+
+def selfPlayEpisode(player1, player2):
+    """
+	This function executes a single tictactoe game between two players,
+	typically two RLPlayers sharing one value table, and records the
+	afterstate keys of each player from its own perspective. Nothing
+	is learned here; see RLPlayer.learnFromTrajectory.
+
+	param player1: A Player object, moves first
+	param player2: A Player object
+	return: Tuple (winning Player object or None for a draw,
+			{letter: List of afterstate keys})
+	"""
+
+    board = TicTacToe()
+    board.setPlayers(player1, player2)
+    trajectories = {player1.letter: [], player2.letter: []}
+
+    while not board.isGameOver():
+        player = board.next()
+        player.makeMove(board)
+        trajectories[player.letter].append(board.getKey(player.letter))
+
+    return board.getWinner(), trajectories
+
+
+def finalKey(trajectories, winner, letter):
+    """
+	This function returns the key of the final board of a game played
+	by selfPlayEpisode, from one player's perspective; the reward of
+	the game is the reward of that key.
+
+	param trajectories: Dictionary {letter: List of afterstate keys},
+			of both players
+	param winner: String or None, letter of the winner, None for a draw
+	param letter: String, the player whose perspective is wanted
+	return: String
+	"""
+
+    # The winner made the last move; on a full board it is the first
+    # player, who has made one move more
+    last = winner or max(trajectories, key=lambda player: len(trajectories[player]))
+    key = trajectories[last][-1]
+    return key if last == letter else key.translate(SWAP_SIDES)
+
+
+class Profiler:
+    """
+	This class times the phases of the game loop: move selection by
+	the RL agent and its opponent, board copies, key generation, reward
+	computation and the value update. Only one episode in sampleEvery
+	is timed. While profiling is disabled the game loop only pays for
+	a check of the 'enabled' and 'sampling' flags.
+	"""
+
+    PHASES = ['opponentMove', 'rlMove', 'copy', 'key', 'reward', 'update']
+
+    def __init__(self):
+        """
+		Creates a disabled profiler.
+		"""
+
+        self.enabled = False
+        self.sampling = False
+        self.sampleEvery = 1
+        self.output = None
+        self.originals = []
+        self.reset()
+
+    def reset(self):
+        """
+		Clears all counters.
+		"""
+
+        self.episodes = 0
+        self.sampled = 0
+        self.totals = dict.fromkeys(self.PHASES, 0)
+        self.exclusive = dict.fromkeys(self.PHASES, 0)
+        self.calls = dict.fromkeys(self.PHASES, 0)
+        self.stack = []
+
+    def enable(self, sampleEvery=10, output=None):
+        """
+		Starts profiling. Board copies, key generation, reward and value
+		updates are timed by wrapping those methods; the wrappers are
+		removed again by disable().
+
+		param sampleEvery: Integer, time one episode in this many
+		param output: String or None, JSON file written by export();
+				None prints a table instead
+		"""
+
+        self.sampleEvery = sampleEvery
+        self.output = output
+
+        if not self.enabled:
+            for cls, name, phase in [(TicTacToe, 'copy', 'copy'), (TicTacToe, 'getKey', 'key'),
+                                     (RLPlayer, 'getReward', 'reward'), (RLPlayer, 'rewardState', 'update')]:
+                original = cls.__dict__[name]
+                self.originals.append((cls, name, original))
+                setattr(cls, name, self.wrap(phase, original))
+
+        self.enabled = True
+
+    def disable(self):
+        """
+		Stops profiling and restores the original methods.
+		"""
+
+        for cls, name, original in self.originals:
+            setattr(cls, name, original)
+
+        self.originals = []
+        self.enabled = False
+        self.sampling = False
+
+    def wrap(self, phase, method):
+        """
+		Returns a version of method which is timed in sampled episodes.
+		"""
+
+        profiler = self
+
+        def timed(*args, **kwargs):
+            if not profiler.sampling:
+                return method(*args, **kwargs)
+            return profiler.call(phase, method, *args, **kwargs)
+
+        timed.__doc__ = method.__doc__
+        return timed
+
+    def beginEpisode(self):
+        """
+		Marks the start of an episode and decides whether it is sampled.
+		"""
+
+        self.episodes += 1
+        self.sampling = self.episodes % self.sampleEvery == 0
+        if self.sampling:
+            self.sampled += 1
+
+    def call(self, phase, function, *args, **kwargs):
+        """
+		Calls function and adds its run time to phase. Time spent in
+		nested timed phases is subtracted from the phase's exclusive time.
+
+		return: the result of function
+		"""
+
+        self.stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            nested = self.stack.pop()
+            self.totals[phase] += elapsed
+            self.exclusive[phase] += elapsed - nested
+            self.calls[phase] += 1
+            if self.stack:
+                self.stack[-1] += elapsed
+
+    def toDict(self):
+        """
+		Returns the counters, per phase, as a dictionary
+
+		return: Dictionary
+		"""
+
+        phases = {}
+        for phase in self.PHASES:
+            phases[phase] = {
+                'calls': self.calls[phase],
+                'totalNs': self.totals[phase],
+                'exclusiveNs': self.exclusive[phase],
+                'nsPerEpisode': self.totals[phase] / self.sampled if self.sampled else 0,
+            }
+
+        return {'episodes': self.episodes, 'sampledEpisodes': self.sampled,
+                'sampleEvery': self.sampleEvery, 'phases': phases}
+
+    def report(self):
+        """
+		Returns the counters as a printable table. Total time includes
+		nested phases (a move includes the copies it makes), self time
+		does not.
+
+		return: String
+		"""
 
-    return Player(letter, playerType)
+        selfTime = sum(self.exclusive.values()) or 1
+        lines = [f'Profile: {self.sampled} of {self.episodes} episodes sampled',
+                 f'{"Phase":<14} {"Calls":>9} {"Total ms":>10} {"Self ms":>10} {"Self %":>7} {"us/episode":>11}',
+                 '-' * 66]
 
+        for phase in self.PHASES:
+            perEpisode = self.totals[phase] / self.sampled / 1000 if self.sampled else 0
+            lines.append(f'{phase:<14} {self.calls[phase]:>9} {self.totals[phase] / 1e6:>10.2f} '
+                         f'{self.exclusive[phase] / 1e6:>10.2f} {100 * self.exclusive[phase] / selfTime:>6.1f}% '
+                         f'{perEpisode:>11.2f}')
 
-def get_current_row():
-    """
-    This function returns the number of the episode
+        return '\n'.join(lines)
+
+    def export(self):
+        """
+		Writes the counters to the JSON output file, or prints the table
+		if there is no output file.
+		"""
+
+        if self.output:
+            with open(self.output, 'w') as out:
+                json.dump(self.toDict(), out, indent=2)
+        else:
+            print(self.report())
+
+
+PROFILER = Profiler()
+
+
+class MetricsLogger:
     """
+	This class streams training metrics to a JSON lines or CSV file.
+	Every 'every' episodes a row is emitted with the rolling win, draw
+	and loss rates, episodes per second, value table size, mean absolute
+	TD error and epsilon. Rows are written by a background thread so
+	the game loop never waits for the disk.
+	"""
+
+    FIELDS = ['episode', 'time', 'winRate', 'drawRate', 'lossRate', 'episodesPerSec',
+              'tableSize', 'meanAbsTDError', 'epsilon']
+
+    def __init__(self, path, every=1000, window=1000):
+        """
+		Creates a metrics logger and starts its writer thread.
+
+		param path: String, output file; '.csv' files are written as CSV,
+				anything else as JSON lines
+		param every: Integer, episodes between two rows
+		param window: Integer, episodes the rolling rates are taken over
+		"""
+
+        self.path = path
+        self.every = every
+        self.episode = 0
+        self.outcomes = collections.deque(maxlen=window)
+        self.errors = collections.deque(maxlen=window)
+        self.lastTime = time.perf_counter()
+        self.lastEpisode = 0
+
+        self.rows = queue.Queue()
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.writer.start()
+
+    def record(self, board, rlplayer):
+        """
+		Records the outcome of a finished episode and emits a row every
+		'every' episodes.
+
+		param board: TicTacToe object, the finished game
+		param rlplayer: RLPlayer object
+		"""
+
+        if board.isGameWon(rlplayer.letter):
+            self.outcomes.append(1)
+        elif board.isGameWon(rlplayer.opponent):
+            self.outcomes.append(-1)
+        else:
+            self.outcomes.append(0)
+        self.errors.append(abs(rlplayer.tdError))
+
+        self.episode += 1
+        if self.episode % self.every == 0:
+            self.emit(rlplayer)
+
+    def emit(self, rlplayer):
+        """
+		Hands a row with the current metrics to the writer thread.
+
+		param rlplayer: RLPlayer object
+		"""
+
+        now = time.perf_counter()
+        games = len(self.outcomes)
+
+        self.rows.put({
+            'episode': self.episode,
+            'time': time.time(),
+            'winRate': self.outcomes.count(1) / games,
+            'drawRate': self.outcomes.count(0) / games,
+            'lossRate': self.outcomes.count(-1) / games,
+            'episodesPerSec': (self.episode - self.lastEpisode) / max(now - self.lastTime, 1e-9),
+            'tableSize': len(rlplayer.valueFunction),
+            'meanAbsTDError': sum(self.errors) / len(self.errors),
+            'epsilon': rlplayer.epsilon,
+        })
+
+        self.lastTime = now
+        self.lastEpisode = self.episode
+
+    def write(self):
+        """
+		Writer thread: appends rows to the output file until close() is
+		called.
+		"""
+
+        isCSV = self.path.endswith('.csv')
+
+        with open(self.path, 'w', newline='') as out:
+            if isCSV:
+                writer = csv.DictWriter(out, fieldnames=self.FIELDS)
+                writer.writeheader()
+
+            while True:
+                row = self.rows.get()
+                if row is None:
+                    break
+
+                if isCSV:
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row) + '\n')
 
+                # Flush once the backlog is written so the file can be followed
+                if self.rows.empty():
+                    out.flush()
 
-def train(player1, player2, episodes):
+    def close(self):
+        """
+		Writes the remaining rows and stops the writer thread.
+		"""
+
+        self.rows.put(None)
+        self.writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def enableProfiling(sampleEvery=10, output=None):
     """
-	This function executes n (as specified by episodes) tictactoe games
+	This function turns on profiling of train() and Tournament games.
+	The counters are exported at the end of every train() and
+	Tournament.start call.
 
-	param player1: A Player object
-	param player2: A Player object
-	param episodes: Number of tictactoe games to play for training
+	param sampleEvery: Integer, time one episode in this many
+	param output: String or None, JSON file to write; None prints a table
 	"""
-    for i in range(episodes):
-        board = TicTacToe()
-        board.setPlayers(player1, player2)
-        runEpisode(board)
+    PROFILER.enable(sampleEvery, output)
 
 
-def runEpisode(board):
+def disableProfiling():
     """
-	This function executes a single tictactoe game and updates
-	the state value table after every move played by the RL agent.
-	:param: board: A TicTacToe object
+	This function turns off profiling and clears its counters.
 	"""
+    PROFILER.disable()
+    PROFILER.reset()
 
-    players = board.getPlayers()
-    rlplayer = players[0]
 
-    if not rlplayer.getType() == RL_AGENT:
-        rlplayer = players[1]
+class OpponentModel:
+    """
+	This class learns how an opponent plays: it counts, per state, the
+	moves the opponent actually made, and computes the exact best
+	response to that empirical model by dynamic programming. States
+	are keyed from the perspective of the agent playing against the
+	opponent (L is the agent, T the opponent, T to move).
+	"""
 
-    rlplayer.previousState = board.copy()
-    while not board.isGameOver():
-        player = board.next()
-        player.makeMove(board)
+    def __init__(self, prior=1.0):
+        """
+		param prior: Float, pseudo-count added to every legal move, so
+				a state seen only a few times is not taken for a
+				deterministic one; in states without observations the
+				opponent is assumed to play uniformly at random either way
+		"""
 
-    rlplayer.rewardState(board)
+        self.prior = prior
+        # Counts of move m in state s at index 9 * s + m
+        self.counts = array.array('I', [0]) * (9 * STATE_COUNT)
+        self.observations = 0
+
+    def observe(self, key, move):
+        """
+		Records a move of the opponent.
+
+		param key: String, the state before the move, from the agent's
+				perspective
+		param move: Integer (0..8)
+		"""
+
+        self.counts[9 * stateId(key) + move] += 1
+        self.observations += 1
+
+    def distribution(self, key):
+        """
+		Returns the modelled probabilities of the opponent's moves.
+
+		param key: String, a state with the opponent to move
+		return: List of (move, probability) pairs over the legal moves
+		"""
+
+        base = 9 * stateId(key)
+        moves = [location for location in range(9) if key[location] == '*']
+        weights = [self.counts[base + location] + self.prior for location in moves]
+        total = sum(weights)
+
+        if total == 0:
+            return [(location, 1 / len(moves)) for location in moves]
+        return [(location, weight / total) for location, weight in zip(moves, weights) if weight]
+
+    def bestResponse(self, fileName=None, scheme=None):
+        """
+		Computes the policy with the highest expected reward against
+		the modelled opponent, for every reachable state in which the
+		agent is to move. Ties are broken like RLPlayer.getRLMove.
+
+		param fileName: String or None, file the policy is also saved to
+		param scheme: RewardScheme object or None for the default; its
+				win, draw and loss rewards are maximised
+		return: array.array of signed bytes, like RLPlayer.exportPolicy,
+				to be played by a PolicyPlayer
+		"""
+
+        scheme = scheme or defaultRewardScheme()
+        values = {}
+
+        def afterstateValue(key):
+            # Expected reward once the agent has moved to key
+            winner = keyWinner(key)
+            if winner is not None:
+                return scheme.win if winner == 'L' else scheme.loss
+            if '*' not in key:
+                return scheme.draw
+
+            expected = 0.0
+            for location, probability in self.distribution(key):
+                expected += probability * stateValue(key[:location] + 'T' + key[location + 1:])
+            return expected
+
+        def stateValue(key):
+            # Expected reward of the best move, with the agent to move
+            if key not in values:
+                winner = keyWinner(key)
+                if winner is not None:
+                    values[key] = (scheme.win if winner == 'L' else scheme.loss), -1
+                elif '*' not in key:
+                    values[key] = scheme.draw, -1
+                else:
+                    best = (-math.inf, -1)
+                    for location in range(9):
+                        if key[location] == '*':
+                            value = afterstateValue(key[:location] + 'L' + key[location + 1:])
+                            if value >= best[0]:
+                                best = (value, location)
+                    values[key] = best
+            return values[key][0]
+
+        policy = array.array('b', [-1]) * STATE_COUNT
+        for key in reachableKeys():
+            own = key.count('L')
+            if keyWinner(key) is None and '*' in key and key.count('T') in (own, own + 1):
+                stateValue(key)
+                policy[stateId(key)] = values[key][1]
+
+        if fileName is not None:
+            with open(fileName, 'wb') as out:
+                policy.tofile(out)
+
+        return policy
 
 
 class TicTacToe:
@@ -82,6 +1507,8 @@ class TicTacToe:
 	keeps track of the moves that have been made.
 	"""
 
+    winning_lines = WINNING_LINES
+
     def __init__(self):
 
         """
@@ -326,6 +1753,21 @@ class TicTacToe:
 
         return False
 
+    def undoMove(self, location, lastMove=None):
+        """
+		Takes back the move at location, which must be the most
+		recent move. Used by search agents to explore moves in place
+		instead of copying the board.
+
+		param location: Integer, the square to clear (0..8)
+		param lastMove: Integer or None, the move played before it
+		"""
+
+        self.board[location] = '*'
+        self.moveCount -= 1
+        self.lastMove = lastMove
+        bisect.insort(self.remainingMoves, location)
+
     def copy(self):
         """
 		Makes a copy of the tictactoe board.
@@ -414,6 +1856,17 @@ class Player:
 
         return self.playerType
 
+    def setTimeBudget(self, seconds):
+        """
+		Tells the player how long it may think about its next move,
+		on top of any budget it was created with. Agents that cannot
+		stop their search early (anytime agents can) ignore the budget.
+
+		param seconds: Float or None, None removes the limit again
+		"""
+
+        pass
+
     def makeMove(self, board):
         """
 		This method selects a random move. This method should be similar
@@ -486,13 +1939,26 @@ class Tournament:
 	tournament, call enableHumanPlayer() to show the board.
 	"""
 
-    def __init__(self):
+    def __init__(self, moveTime=None, gameTime=None, forfeitPolicy=FORFEIT_LOSS):
         """
-		Creates a new tournament.
+		Creates a new tournament. Without moveTime and gameTime the
+		games are played without time control.
+
+		param moveTime: Float or None, seconds allowed per move
+		param gameTime: Float or None, seconds allowed per player per game
+		param forfeitPolicy: FORFEIT_LOSS (a player who exceeds its time
+				loses the game) or FORFEIT_IGNORE (only counted)
 		"""
 
         self.board = None
         self.humanPlaying = False
+        self.moveTime = moveTime
+        self.gameTime = gameTime
+        self.forfeitPolicy = forfeitPolicy
+        self.clocks = {}
+        self.latencies = {}
+        self.forfeits = {}
+        self.models = {}
 
     def getBoard(self):
         """
@@ -512,6 +1978,17 @@ class Tournament:
 
         self.humanPlaying = True
 
+    def watch(self, player, model):
+        """
+		Records the moves a player makes in the following games in an
+		opponent model.
+
+		param player: Player object
+		param model: OpponentModel object
+		"""
+
+        self.models[player] = model
+
     def start(self, player1, player2, games=1):
         """
 		This method performs the tournament; n games are played.
@@ -534,6 +2011,9 @@ class Tournament:
                 else:
                     print(f'Draw')
 
+        if PROFILER.enabled:
+            PROFILER.export()
+
     def game(self, p1, p2):
         """
 		This method executes a single game of tictactoe between
@@ -545,6 +2025,11 @@ class Tournament:
 
         self.board = TicTacToe()
         self.board.setPlayers(p1, p2)
+        self.clocks = {p1: self.gameTime, p2: self.gameTime}
+        forfeited = None
+
+        if PROFILER.enabled:
+            PROFILER.beginEpisode()
 
         if self.humanPlaying:
             self.board.drawBoard()
@@ -552,16 +2037,76 @@ class Tournament:
         while not self.board.isGameOver():
 
             player = self.board.next()
-            player.makeMove(self.board)
+            budget = self.moveBudget(player)
+            if budget is not None:
+                player.setTimeBudget(budget * TIME_BUDGET_SAFETY)
+
+            model = self.models.get(player)
+            if model is not None:
+                key = self.board.getKey(player.opponent)
+                moveCount = self.board.moveCount
+
+            start = time.perf_counter()
+            if PROFILER.sampling:
+                phase = 'rlMove' if player.getType() == RL_AGENT else 'opponentMove'
+                PROFILER.call(phase, player.makeMove, self.board)
+            else:
+                player.makeMove(self.board)
+            elapsed = time.perf_counter() - start
+
+            if budget is not None:
+                player.setTimeBudget(None)
+
+            if model is not None and self.board.moveCount > moveCount:
+                model.observe(key, self.board.lastMove)
+
+            self.latencies.setdefault(player, []).append(elapsed)
+            if self.clocks[player] is not None:
+                self.clocks[player] -= elapsed
+
+            # The even share of the game clock is only a hint to the player;
+            # it forfeits when the clock itself runs out
+            overMoveTime = self.moveTime is not None and elapsed > self.moveTime
+            overGameTime = self.clocks[player] is not None and self.clocks[player] < 0
+            if overMoveTime or overGameTime:
+                self.forfeits[player] = self.forfeits.get(player, 0) + 1
+                if self.forfeitPolicy == FORFEIT_LOSS:
+                    forfeited = player
+                    break
 
             if self.humanPlaying:
                 self.board.drawBoard()
 
-        player = self.board.getWinner()
+        if forfeited is not None:
+            player = p2 if forfeited is p1 else p1
+        else:
+            player = self.board.getWinner()
 
         if player:
             player.winner = True
 
+    def moveBudget(self, player):
+        """
+		Works out the time budget the player is asked to keep to on its
+		next move: the per-move limit, or its remaining game time shared
+		evenly over the moves it still has to play, whichever is smaller.
+		Going over the share is not a forfeit, only running out of the
+		game time or going over the per-move limit is.
+
+		param player: Player object
+		return: Float or None if there is no time control
+		"""
+
+        budget = self.moveTime
+        clock = self.clocks.get(player)
+
+        if clock is not None:
+            movesLeft = (len(self.board.remainingMoves) + 1) // 2
+            share = max(clock, 0.0) / max(movesLeft, 1)
+            budget = share if budget is None else min(budget, share)
+
+        return budget
+
     def elo(self, player1, player2):
         """
 		This method updates each player's rating according to the
@@ -622,8 +2167,168 @@ class Tournament:
             else:
                 print(f'{player.name:<20} {wins:<4} {lost:<5} {draws:<6} {rating:4.1f} {"":<5} {winning_rate:4.1f}%')
 
+        if any(self.latencies.get(player) for player in players):
+            self.printLatencies(players)
+
         print('\n\n')
 
+    def printLatencies(self, players):
+        """
+		This method prints the move latency (p50, p99, max), the number
+		of time forfeits and a latency histogram for each player
+
+		param players: List of Player objects
+		"""
+
+        # Upper bounds of the histogram buckets, in milliseconds
+        buckets = [0.1, 1, 10, 100, 1000, float('inf')]
+        labels = ['<0.1ms', '<1ms', '<10ms', '<100ms', '<1s', '>=1s']
+
+        print()
+        print(f'{"Agents":<20} {"Moves":<7} {"p50 ms":<10} {"p99 ms":<10} {"Max ms":<10} {"Forfeits":<8}')
+        print('-' * 60)
+
+        for player in players:
+            times = sorted(t * 1000 for t in self.latencies.get(player, []))
+            if not times:
+                continue
+
+            p50 = times[min(len(times) - 1, int(0.50 * len(times)))]
+            p99 = times[min(len(times) - 1, int(0.99 * len(times)))]
+            forfeits = self.forfeits.get(player, 0)
+            print(f'{player.name:<20} {len(times):<7} {p50:<10.3f} {p99:<10.3f} {times[-1]:<10.3f} {forfeits:<8}')
+
+            counts = [0] * len(buckets)
+            for t in times:
+                for i, bound in enumerate(buckets):
+                    if t < bound:
+                        counts[i] += 1
+                        break
+
+            for label, count in zip(labels, counts):
+                if count:
+                    bar = '#' * max(1, round(40 * count / len(times)))
+                    print(f'{"":<20} {label:>7} {bar} {count}')
+
+
+# Shaping functions RewardScheme can be compiled from, by name
+REWARD_SHAPINGS = {}
+
+
+def registerShaping(name, shaping=None):
+    """
+	This function registers a shaping function under a name, so a
+	RewardScheme can be created from the name. It can also be used as
+	a decorator: @registerShaping('name').
+
+	param name: String
+	param shaping: Callable taking a key of a reachable, unfinished
+			state and returning its reward
+	return: The shaping function
+	"""
+
+    if shaping is None:
+        return lambda function: registerShaping(name, function)
+
+    REWARD_SHAPINGS[name] = shaping
+    return shaping
+
+
+@registerShaping('firstMove')
+def firstMoveShaping(key):
+    """
+	The agent's first move is rewarded: the centre with 10, a corner
+	with 2 and an edge with -5. Later unfinished states are neutral.
+
+	param key: String
+	return: Integer
+	"""
+
+    if key.count('L') != 1:
+        return 0
+
+    location = key.index('L')
+    if location == 4:
+        return 10
+    elif location in [0, 2, 6, 8]:
+        return 2
+    return -5
+
+
+@registerShaping('none')
+def noShaping(key):
+    """
+	Unfinished states are neutral; only the result of a game counts.
+	"""
+
+    return 0
+
+
+class RewardScheme:
+    """
+	This class holds the reward of every state in a dense array indexed
+	by state id. Finished games get the win, loss or draw reward; the
+	shaping function is evaluated once for every reachable unfinished
+	state when the scheme is created, so a reward is a single lookup
+	during training.
+	"""
+
+    def __init__(self, shaping='firstMove', win=WIN_REWARD, loss=LOSS_REWARD, draw=DRAW_REWARD):
+        """
+		param shaping: String, a name registered with registerShaping,
+				or a shaping function
+		param win: Number, reward of a won game
+		param loss: Number, reward of a lost game
+		param draw: Number, reward of a drawn game
+		"""
+
+        if not callable(shaping):
+            shaping = REWARD_SHAPINGS[shaping]
+
+        self.win = win
+        self.loss = loss
+        self.draw = draw
+
+        self.rewards = array.array('d', bytes(8 * STATE_COUNT))
+        # 1 for the states of a finished game
+        self.terminal = bytearray(STATE_COUNT)
+
+        for key in reachableKeys():
+            state = stateId(key)
+            winner = keyWinner(key)
+
+            if winner == 'L':
+                self.rewards[state] = win
+            elif winner == 'T':
+                self.rewards[state] = loss
+            elif '*' not in key:
+                self.rewards[state] = draw
+            else:
+                self.rewards[state] = shaping(key)
+                continue
+
+            self.terminal[state] = 1
+
+    def reward(self, key):
+        """
+		param key: String, a state key
+		return: Float, the reward of the state
+		"""
+
+        return self.rewards[stateId(key)]
+
+
+@functools.lru_cache(maxsize=None)
+def defaultRewardScheme():
+    """
+	This function returns the RewardScheme RLPlayer uses unless it is
+	given another one. It is compiled once and cached.
+
+	return: RewardScheme object
+	"""
+
+    return RewardScheme()
+
 
 class RLPlayer(Player):
     """
@@ -645,6 +2350,30 @@ class RLPlayer(Player):
         self.valueFunction = {}
         self.previousState = None
         self.mode = PLAYING_MODE
+        self.tdError = 0.0
+        self.valueChange = 0.0
+        # Number of visits of each state, indexed by state id, see countVisit
+        self.visitCounts = newVisitCounts()
+        # States changed since the last checkpoint
+        self.dirty = set()
+        # RewardScheme object, None for defaultRewardScheme()
+        self.rewardScheme = None
+
+        self.exploration = EXPLORE_EPSILON
+        self.ucbConstant = 5.0
+        self.epsilonDecay = 100
+        self.learningRateByVisits = False
+
+        # Incremented on every change of the value table; the move cache
+        # of playing mode is only valid for the version it was built for
+        self.policyVersion = 0
+        self.moveCache = {}
+        self.cacheVersion = None
+        self.cacheTable = None
+
+        # In sparse mode reads never add default entries to the table,
+        # see setSparse
+        self.sparse = False
 
     def initTraining(self, learning, discount, epsilon):
         """
@@ -655,35 +2384,213 @@ class RLPlayer(Player):
 		param epsilon: Float (0..1)
 		"""
 
-        self.learningRate = learning
-        self.discountRate = discount
-        self.epsilon = epsilon
-        self.previousState = None
-        self.mode = TRAINING_MODE
+        self.learningRate = learning
+        self.discountRate = discount
+        self.epsilon = epsilon
+        self.previousState = None
+        self.mode = TRAINING_MODE
+
+    def setMode(self, mode):
+        """
+		Sets playing mode, TRAINING_MODE or PLAYING_MODE
+
+		param mode: Integer
+		"""
+
+        self.mode = mode
+
+    def getMode(self):
+        """
+		Get's the playing mode
+
+		return: Integer
+		"""
+
+        return self.mode
+
+    def setSparse(self, sparse=True):
+        """
+		Switches sparse mode on or off. In sparse mode the table only
+		holds states that were actually updated: valueOfState returns
+		0 for a missing state without storing it, and move selection
+		values a missing afterstate that ends the game by its reward
+		instead of skipping it. This is the mode to play a table pruned
+		by compactTable with.
+
+		param sparse: Boolean
+		"""
+
+        self.sparse = sparse
+        self.policyVersion += 1
+
+    def afterstateValue(self, key):
+        """
+		Returns the value move selection uses for an afterstate.
+
+		param key: String
+		return: Float, or None if the afterstate is not a candidate
+		"""
+
+        if key in self.valueFunction:
+            return self.valueFunction[key]
+        if not self.sparse:
+            return None
+
+        scheme = self.rewardScheme or defaultRewardScheme()
+        state = stateId(key)
+        return scheme.rewards[state] if scheme.terminal[state] else None
+
+    def warmStart(self, scale=1.0, noise=0.0):
+        """
+		Seeds the value table with the exact value of every reachable
+		afterstate: the reward of the game's result under perfect play
+		(see solvedValue), times scale, plus Gaussian noise. Training
+		then only has to fine-tune the table against its opponent.
+
+		param scale: Float, multiplies the solved values
+		param noise: Float, standard deviation of the noise; 0 for none
+		"""
+
+        scheme = self.rewardScheme or defaultRewardScheme()
+        rewards = {1: scheme.win, 0: scheme.draw, -1: scheme.loss}
+
+        for key in reachableKeys():
+            if isAfterstate(key):
+                value = scale * rewards[solvedValue(key)]
+                if noise:
+                    value += random.gauss(0.0, noise)
+                self.valueFunction[key] = value
+                self.dirty.add(key)
+
+        self.policyVersion += 1
+
+    def clone(self):
+        """
+		Makes an independent copy of the agent with its whole learning
+		state: value table, visit counts, exploration settings, reward
+		scheme and hyper-parameters. The reward scheme is shared, it is
+		never changed.
+
+		return: RLPlayer object
+		"""
+
+        agent = copy.copy(self)
+        agent.valueFunction = dict(self.valueFunction)
+        agent.visitCounts = self.visitCounts[:]
+        agent.dirty = set(self.dirty)
+        agent.previousState = None
+        agent.moveCache = {}
+        agent.cacheVersion = None
+        agent.cacheTable = None
+        return agent
+
+    def setExploration(self, strategy=EXPLORE_EPSILON, ucbConstant=5.0, epsilonDecay=100,
+                       learningRateByVisits=False):
+        """
+		Sets how the agent explores in training mode. The count based
+		strategies use the visit counts of the afterstates of the legal
+		moves; the visits of a state are the sum of them.
+
+		EXPLORE_EPSILON: a random move with probability epsilon
+		EXPLORE_DECAYING_EPSILON: a random move with probability
+				epsilon * epsilonDecay / (epsilonDecay + visits of the
+				state), so well known states are explored less
+		EXPLORE_UCB: the move with the best value plus a bonus of
+				ucbConstant * sqrt(ln(visits of the state + 1) /
+				(visits of the afterstate + 1)), no random moves
+
+		param strategy: Integer, one of the strategies above
+		param ucbConstant: Float, weight of the UCB bonus
+		param epsilonDecay: Float, state visits at which the decaying
+				epsilon has halved
+		param learningRateByVisits: Boolean, learn with a rate of 1/n
+				on the n-th update of a state instead of learningRate
+		"""
+
+        self.exploration = strategy
+        self.ucbConstant = ucbConstant
+        self.epsilonDecay = epsilonDecay
+        self.learningRateByVisits = learningRateByVisits
+
+    def afterstateVisits(self, board):
+        """
+		Returns the legal moves with the state id of their afterstates
+		and the visits of the current state.
+
+		param board: TicTacToe object
+		return: Tuple (List of (move, state id), Integer)
+		"""
+
+        moves = []
+        visits = 0
+        for location in board.remainingMoves:
+            cboard = board.copy()
+            cboard.makeMove(location, self.letter)
+            state = stateId(cboard.getKey(self.letter))
+            moves.append((location, state))
+            visits += self.visitCounts[state]
+        return moves, visits
+
+    def getUCBMove(self, board):
+        """
+		Returns the move with the best value plus UCB bonus.
+
+		param board: TicTacToe object
+		return: Integer, the move
+		"""
+
+        moves, visits = self.afterstateVisits(board)
+        logVisits = math.log(visits + 1)
+        bestMove = None
+        bestValue = -math.inf
 
-    def setMode(self, mode):
+        for location, state in moves:
+            value = self.valueFunction.get(stateKey(state), 0) \
+                    + self.ucbConstant * math.sqrt(logVisits / (self.visitCounts[state] + 1))
+            if value >= bestValue:
+                bestValue = value
+                bestMove = location
+
+        return bestMove
+
+    def countVisit(self, key):
         """
-		Sets playing mode, TRAINING_MODE or PLAYING_MODE
+		Counts a visit of a state. A state is visited when the agent
+		plays it in a training game (see runEpisode) or, when the game
+		is learned from its trajectory, when its value is updated, so
+		every afterstate played is counted once.
 
-		param mode: Integer
+		param key: String
+		return: Integer, the visits of the state so far
 		"""
 
-        self.mode = mode
+        state = stateId(key)
+        self.visitCounts[state] += 1
+        self.dirty.add(key)
+        return self.visitCounts[state]
 
-    def getMode(self):
+    def visit(self, key):
         """
-		Get's the playing mode
+		Counts an update of a state and returns the learning rate of
+		the update.
 
-		return: Integer
+		param key: String
+		return: Float
 		"""
 
-        return self.mode
+        visits = self.countVisit(key)
+        self.policyVersion += 1
+
+        if self.learningRateByVisits:
+            return 1.0 / visits
+        return self.learningRate
 
     def getRLMove(self, board):
         """
 		This method performs moves for the RL; it uses the learned
 		policy.  It selects the best move according to the state
-		value table.
+		value table.  In playing mode the move chosen for a board is
+		cached until the table changes (see policyVersion).
 
 		param board: TicTacToe object
 		param epsilon: This variable controls how often the RL agent
@@ -691,6 +2598,17 @@ class RLPlayer(Player):
 					new moves
 		"""
 
+        if self.mode == PLAYING_MODE:
+            if self.cacheVersion != self.policyVersion or self.cacheTable is not self.valueFunction:
+                self.moveCache = {}
+                self.cacheVersion = self.policyVersion
+                self.cacheTable = self.valueFunction
+
+            state = "".join(board.board)
+            if state in self.moveCache:
+                board.makeMove(self.moveCache[state], self.letter)
+                return
+
         bestMove = None
         bestValue = -99999
 
@@ -698,15 +2616,20 @@ class RLPlayer(Player):
             cboard = board.copy()
             cboard.makeMove(location, self.letter)
             key = cboard.getKey(self.letter)
+            value = self.valueFunction.get(key)
+            if value is None and self.sparse:
+                value = self.afterstateValue(key)
 
-            if key in self.valueFunction:
-                if self.valueFunction[key] >= bestValue:
-                    bestValue = self.valueFunction[key]
-                    bestMove = location
+            if value is not None and value >= bestValue:
+                bestValue = value
+                bestMove = location
 
         if bestMove is not None:
             move = bestMove
+            if self.mode == PLAYING_MODE:
+                self.moveCache[state] = move
         else:
+            # Random moves are never cached
             move = random.choice(board.remainingMoves)
 
         moveLegal = board.makeMove(move, self.letter)
@@ -717,7 +2640,8 @@ class RLPlayer(Player):
     def valueOfState(self, key):
         """
 		Gets the value of a game state.  If that state hasn't been
-		encountered before then set it's value to 0
+		encountered before then set it's value to 0; in sparse mode
+		the 0 is returned without being stored
 
 		param key: String
 		return: Float
@@ -725,28 +2649,104 @@ class RLPlayer(Player):
 
         if key in self.valueFunction:
             return self.valueFunction[key]
+        elif self.sparse:
+            return 0
         else:
             self.valueFunction[key] = 0
+            self.dirty.add(key)
+            self.policyVersion += 1
             return 0
 
-    def save(self):
+    def save(self, fileName=POLICY_FILE):
         """
 		This method saves the learned policy.
+
+		param fileName: String, path of the policy file
 		"""
 
-        with open('cse_policy_hw2.txt', 'w') as out:
+        with open(fileName, 'w') as out:
             for k, v in self.valueFunction.items():
                 out.write(k + ':' + str(v) + '\n')
 
-    def _load(self):
+    def _load(self, fileName=POLICY_FILE):
         """
 		This method loads a policy from a text file
+
+		param fileName: String, path of the policy file
 		"""
 
-        with open('cse_policy_hw2.txt', 'r') as policy:
+        with open(fileName, 'r') as policy:
             for line in policy:
                 kv = line.split(':')
                 self.valueFunction[kv[0]] = float(kv[1])
+        self.policyVersion += 1
+
+    def saveBinary(self, fileName):
+        """
+		This method saves the learned policy in the compact binary
+		format: STATE_COUNT native doubles indexed by state id, NaN
+		where the table has no entry.
+
+		param fileName: String, path of the policy file
+		"""
+
+        table = array.array('d', [math.nan]) * STATE_COUNT
+        for k, v in self.valueFunction.items():
+            table[stateId(k)] = v
+
+        with open(fileName, 'wb') as out:
+            table.tofile(out)
+
+    def loadBinary(self, fileName):
+        """
+		This method loads a policy saved by saveBinary
+
+		param fileName: String, path of the policy file
+		"""
+
+        table = array.array('d')
+        with open(fileName, 'rb') as policy:
+            table.fromfile(policy, STATE_COUNT)
+
+        for state, value in enumerate(table):
+            if not math.isnan(value):
+                self.valueFunction[stateKey(state)] = value
+        self.policyVersion += 1
+
+    def exportPolicy(self, fileName=None):
+        """
+		This method distills the value table into a greedy policy: the
+		move getRLMove would play, for every reachable state in which
+		the agent is to move, indexed by state id. States without a
+		known afterstate, where getRLMove plays randomly, hold -1.
+
+		param fileName: String or None, file the policy is also saved to
+		return: array.array of signed bytes, see loadPolicy
+		"""
+
+        policy = array.array('b', [-1]) * STATE_COUNT
+
+        for key in reachableKeys():
+            own = key.count('L')
+            if keyWinner(key) is not None or '*' not in key or key.count('T') not in (own, own + 1):
+                continue
+
+            bestMove = -1
+            bestValue = -99999
+            for location in range(9):
+                if key[location] == '*':
+                    value = self.afterstateValue(key[:location] + 'L' + key[location + 1:])
+                    if value is not None and value >= bestValue:
+                        bestValue = value
+                        bestMove = location
+
+            policy[stateId(key)] = bestMove
+
+        if fileName is not None:
+            with open(fileName, 'wb') as out:
+                policy.tofile(out)
+
+        return policy
 
     def makeMove(self, board):
         """
@@ -758,10 +2758,17 @@ class RLPlayer(Player):
         # Homework 2: Implement this method as described in the
         # assignment brief.  Write your code here.
 
-        if self.mode == TRAINING_MODE:
+        if self.mode == TRAINING_MODE and self.exploration == EXPLORE_UCB:
+            board.makeMove(self.getUCBMove(board), self.letter)
+        elif self.mode == TRAINING_MODE:
+            epsilon = self.epsilon
+            if self.exploration == EXPLORE_DECAYING_EPSILON:
+                visits = self.afterstateVisits(board)[1]
+                epsilon *= self.epsilonDecay / (self.epsilonDecay + visits)
+
             # if mode is training, make a random or best move based on epsilon
             # 如果是训练模式 根据 epsilon 做一个随机移动（取值0-1）或者最好的移动
-            if random.random() < self.epsilon:
+            if random.random() < epsilon:
                 # move randomly
                 move = random.choice(board.remainingMoves)
                 board.makeMove(move, self.letter)
@@ -796,7 +2803,9 @@ class RLPlayer(Player):
 
         # Calculate reward using the Bellman equation
         reward = self.getReward(board)
-        value = prevVal + self.learningRate * (reward + self.discountRate * self.valueOfState(boardKey) - prevVal)
+        self.tdError = reward + self.discountRate * self.valueOfState(boardKey) - prevVal
+        value = prevVal + self.visit(prevBoardKey) * self.tdError
+        self.valueChange = value - prevVal
 
         # Update value function table
         self.valueFunction[prevBoardKey] = value
@@ -804,103 +2813,333 @@ class RLPlayer(Player):
         # Update previous board state
         self.previousState = board.copy()
 
+    def learnFromTrajectory(self, keys, reward):
+        """
+		This method updates the value function 'table' from the
+		afterstates the agent produced during one game. The states are
+		updated from the end of the game backwards, so the final reward
+		reaches the opening in a single pass.
+
+		param keys: List of Strings, the keys of the agent's afterstates
+				in the order they were played
+		param reward: Float, reward of the finished game, see
+				RewardScheme
+		"""
+
+        target = reward
+        for key in reversed(keys):
+            prevVal = self.valueOfState(key)
+            self.tdError = target - prevVal
+            value = prevVal + self.visit(key) * self.tdError
+            self.valueChange = value - prevVal
+
+            self.valueFunction[key] = value
+
+            target = self.discountRate * value
+
     def getReward(self, board):
         """
-		This method analyses the board and determines a reward.  The
-		exact reward scheme will be designed by the student.  This will
-		be determined by the student.  However, it should return an
-		integer value (negative or positive)
+		This method determines the reward of a board from the agent's
+		reward scheme (see RewardScheme); by default the result of a
+		finished game and a bonus or penalty for the agent's first move.
 
 		param board: TicTacToe object
-		return: Integer
+		return: Float
 		"""
 
-        # Homework 2: Implement this method as described in the
-        # assignment brief.  Write your code here.  Your are free
-        # to implement new methods as long as they do not over write
-        # existing essential methods.
-        if board.isGameWon(self.letter):
-            return 22
-        elif board.isGameWon(self.opponent):
-            return -22
-        elif board.isGameDraw():
-            return 4
-
-        # Additional reward strategy for the first move
-        if TicTacToe().moveCount == 0:
-            # This is the first move, so check position:
-            first_move_position = board.lastMove  # Position of the first move
-            if first_move_position == 4:
-                return 10
-            elif first_move_position in [0, 2, 6, 8]:
-                return 2
-            elif first_move_position in [1, 3, 5, 7]:
-                return -5
-            else:
-                return 0
+        scheme = self.rewardScheme or defaultRewardScheme()
+        return scheme.reward(board.getKey(self.letter))
 
-        if self.previousState == 4:
-            if board.lastMove in [0, 2, 6, 8]:
-                return 5
-            elif board.lastMove in [1, 3, 5, 7]:
-                return -5
-            else:
-                return 0
 
-        # If we are at this point in the code, the game is ongoing, and
-        # it is not the first move of the RL agent, so return a neutral reward
-        return 0
+def loadPolicy(fileName):
+    """
+	This function loads a policy saved by RLPlayer.exportPolicy
+
+	param fileName: String, path of the policy file
+	return: array.array of signed bytes, the move per state id, -1 for
+			none
+	"""
+
+    policy = array.array('b')
+    with open(fileName, 'rb') as data:
+        policy.fromfile(data, STATE_COUNT)
+    return policy
+
+
+class PolicyPlayer(Player):
+    """
+	This class represents a frozen RL agent which plays from a policy
+	exported by RLPlayer.exportPolicy. It plays exactly like the RLPlayer
+	in playing mode, at the cost of one array lookup per move.
+	"""
+
+    def __init__(self, letter, policy):
+        """
+		param letter: String, can only be 'X' or 'O'
+		param policy: array.array as returned by exportPolicy, or the
+				path of a policy file
+		"""
+
+        super().__init__(letter, OTHER_AGENT)
+
+        if isinstance(policy, str):
+            policy = loadPolicy(policy)
+        self.policy = policy
+
+    def makeMove(self, board):
+        """
+		param board: TicTacToe object
+		"""
+
+        move = self.policy[stateId(board.getKey(self.letter))]
+        if move < 0:
+            move = random.choice(board.remainingMoves)
+        board.makeMove(move, self.letter)
+
+
+class SnapshotPlayer(Player):
+    """
+	This class represents a frozen RL agent which plays greedily from a
+	policy file in the compact binary format (see RLPlayer.saveBinary).
+	The file is memory-mapped rather than read, so many snapshots can
+	be kept around cheaply.
+	"""
+
+    def __init__(self, letter, fileName):
+        """
+		param letter: String, can only be 'X' or 'O'
+		param fileName: String, path of the binary policy file
+		"""
+
+        super().__init__(letter, OTHER_AGENT)
+
+        self.fileName = fileName
+        with open(fileName, 'rb') as policy:
+            self.map = mmap.mmap(policy.fileno(), 0, access=mmap.ACCESS_READ)
+        self.values = memoryview(self.map).cast('d')
+
+    def makeMove(self, board):
+        """
+		Plays the move with the best afterstate value, breaking ties
+		like RLPlayer.getRLMove; plays randomly if no afterstate is in
+		the table.
+
+		param board: TicTacToe object
+		"""
+
+        bestMove = None
+        bestValue = -99999
+
+        for location in board.remainingMoves:
+            cboard = board.copy()
+            cboard.makeMove(location, self.letter)
+            value = self.values[stateId(cboard.getKey(self.letter))]
+
+            if value >= bestValue:
+                bestValue = value
+                bestMove = location
+
+        if bestMove is None:
+            bestMove = random.choice(board.remainingMoves)
+
+        board.makeMove(bestMove, self.letter)
+
+    def close(self):
+        """
+		Unmaps the policy file.
+		"""
+
+        self.values.release()
+        self.map.close()
 
 
 class minAndMAx(Player):
     """
-    This class represents a player using the minimax strategy.
+    This class represents a player using the minimax strategy, with
+    alpha-beta pruning. With workers > 1 the root moves are searched in
+    parallel by a pool of processes which share the best root value
+    found so far, so every worker prunes with it. The parallel search
+    returns exactly the move the serial search returns, but on a 3x3
+    board a search is too short to pay for the processes: it is about
+    twice as slow as the serial search. Use the player as a context
+    manager (with minAndMAx('X', workers=4) as player: ...) or call
+    close() to shut the pool down; it is also terminated when the
+    player is garbage collected.
     """
 
-    def __init__(self, letter):
+    def __init__(self, letter, workers=1):
+        """
+        param letter: String, can only be 'X' or 'O'
+        param workers: Integer, number of search processes
+        """
         super().__init__(letter, OTHER_AGENT)
+        self.workers = workers
+        self.pool = None
+        self.bound = None
 
     def makeMove(self, board):
         move = self.getBestMove(board)
         board.makeMove(move, self.letter)
 
     def getBestMove(self, board):
+        if self.workers > 1 and len(board.remainingMoves) > 1:
+            return self.parallelSearch(board)
+
         _, move = self.minimax(board, True)
         return move
 
-    def minimax(self, board, isMaximizing):
+    def minimax(self, board, isMaximizing, alpha=-float('inf'), beta=float('inf'), bound=None):
+        """
+        Alpha-beta minimax. Values are exact when they fall inside
+        (alpha, beta), otherwise they are bounds on the exact value.
+
+        param board: TicTacToe object
+        param isMaximizing: True if it is this player's turn
+        param alpha: Float
+        param beta: Float
+        param bound: multiprocessing.Value or None, best root value
+                     found by any worker of a parallel search
+        return: Tuple (value, move)
+        """
         # Check for terminal states first (win, loss, draw)
         if board.isGameWon(self.letter):
             return 10 - board.moveCount, None
         if board.isGameWon(self.opponent):
             return board.moveCount - 10, None
         if board.isGameDraw():
-            return random.randint(0,5), None
+            return 0, None
 
         if isMaximizing:
             bestValue = -float('inf')
             bestMove = None
-            for move in board.remainingMoves:
+            lastMove = board.lastMove
+            for move in board.remainingMoves[:]:
                 board.makeMove(move, self.letter)
-                value, _ = self.minimax(board, not isMaximizing)
-                board.board[move] = '*'  # Undo move
+                value, _ = self.minimax(board, not isMaximizing, alpha, beta, bound)
+                board.undoMove(move, lastMove)
                 if value > bestValue:
                     bestValue = value
                     bestMove = move
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
             return bestValue, bestMove
         else:
             # Minimizing player logic
             bestValue = float('inf')
             bestMove = None
-            for move in board.remainingMoves:
+            lastMove = board.lastMove
+            for move in board.remainingMoves[:]:
+                if bound is not None:
+                    # Anything below another worker's root value is irrelevant;
+                    # values are integers so ties with it are still exact
+                    alpha = max(alpha, bound.value - 1)
                 board.makeMove(move, self.opponent)
-                value, _ = self.minimax(board, not isMaximizing)
-                board.board[move] = '*'  # Undo move
+                value, _ = self.minimax(board, not isMaximizing, alpha, beta, bound)
+                board.undoMove(move, lastMove)
                 if value < bestValue:
                     bestValue = value
                     bestMove = move
+                beta = min(beta, value)
+                if alpha >= beta:
+                    break
             return bestValue, bestMove
 
+    def parallelSearch(self, board):
+        """
+        Young-brothers-wait search of the root: the first move is searched
+        here to get a bound, the remaining moves are then searched by the
+        worker processes. Ties go to the earliest move, as in the serial
+        search.
+
+        param board: TicTacToe object
+        return: Integer, the move to play
+        """
+        if self.pool is None:
+            self.bound = multiprocessing.Value('i', 0)
+            self.pool = multiprocessing.Pool(self.workers, _initMinimaxWorker, (self.bound,))
+
+        moves = board.remainingMoves[:]
+        lastMove = board.lastMove
+
+        board.makeMove(moves[0], self.letter)
+        first, _ = self.minimax(board, False)
+        board.undoMove(moves[0], lastMove)
+        self.bound.value = first
+
+        tasks = [(self.letter, board.board[:], board.moveCount, board.remainingMoves[:], lastMove, move)
+                 for move in moves[1:]]
+        values = [first] + self.pool.map(_minimaxWorker, tasks, chunksize=1)
+
+        best = max(values)
+        return moves[values.index(best)]
+
+    def close(self):
+        """
+        Shuts down the worker processes of the parallel search.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Last resort for players nobody closed
+        pool = self.__dict__.get('pool')
+        if pool is not None:
+            pool.terminate()
+
+    def __getstate__(self):
+        # The worker pool can not be pickled; a copy creates its own
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['bound'] = None
+        return state
+
+
+_minimaxBound = None
+
+
+def _initMinimaxWorker(bound):
+    """
+    Initialises a minAndMAx worker process with the shared root bound.
+    """
+    global _minimaxBound
+    _minimaxBound = bound
+
+
+def _minimaxWorker(task):
+    """
+    Searches one root move for minAndMAx.parallelSearch and raises the
+    shared root bound if the move is better than anything found so far.
+
+    param task: Tuple (letter, cells, moveCount, remainingMoves, lastMove, move)
+    return: Integer, the value of the move (exact if it can be the best)
+    """
+    letter, cells, moveCount, remainingMoves, lastMove, move = task
+
+    board = TicTacToe()
+    board.board = cells
+    board.moveCount = moveCount
+    board.remainingMoves = remainingMoves
+    board.lastMove = lastMove
+
+    player = minAndMAx(letter)
+    board.makeMove(move, letter)
+    value, _ = player.minimax(board, False, bound=_minimaxBound)
+
+    with _minimaxBound.get_lock():
+        if value > _minimaxBound.value:
+            _minimaxBound.value = value
+
+    return value
+
 
 def find_winning_move(board, letter):
     winning_lines = [
@@ -1003,13 +3242,16 @@ class StrategicAgent(Player):
     def makeMove(self, board):
         move = self.strategic_move(board)
 
-        if move is None or not board.makeMove(move, self.letter):
+        if move is None or board.board[move] != '*':
             # Fallback to random move if move is None or the strategic move is not possible
             super().makeMove(board)
         # Optionally let RLAgent win sometimes by making a less optimal move
+        # instead of the strategic one (only one move per turn)
         elif random.random() < 0.1:
             open_spots = [i for i in range(9) if board.board[i] == '*']
             board.makeMove(random.choice(open_spots), self.letter)
+        else:
+            board.makeMove(move, self.letter)
 
     def find_winning_move(self, board, letter):
         # Checks all lines to see if there's a winning move available
@@ -1093,3 +3335,459 @@ class ForkPreventionBot(Player):
                     [board.board[i] for i in line].count('*') == 1:
                 winning_moves += 1
         return winning_moves > 1
+
+
+def tightestBudget(*budgets):
+    """
+    Returns the smallest of the given time budgets, ignoring None.
+
+    return: Float or None if no budget is set
+    """
+    return min((budget for budget in budgets if budget is not None), default=None)
+
+
+class MCTSNode:
+    """
+    A node of the Monte Carlo search tree. A node stands for the position
+    reached after 'letter' played 'move'; its statistics are kept from
+    the point of view of that letter.
+    """
+
+    __slots__ = ('parent', 'move', 'letter', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, parent, move, letter, board):
+        """
+        param parent: MCTSNode object or None
+        param move: Integer or None, the move leading to this node
+        param letter: String, the letter that played move
+        param board: TicTacToe object, the position of this node
+        """
+        self.parent = parent
+        self.move = move
+        self.letter = letter
+        self.children = {}
+        self.untried = [] if board.isGameOver() else board.remainingMoves[:]
+        random.shuffle(self.untried)
+        self.visits = 0
+        self.wins = 0.0
+
+    def selectChild(self, exploration):
+        """
+        Selects the child with the highest UCT score.
+
+        param exploration: Float, the UCT exploration constant
+        return: MCTSNode object
+        """
+        logVisits = math.log(self.visits)
+        best = None
+        bestScore = -float('inf')
+        for child in self.children.values():
+            score = child.wins / child.visits + exploration * math.sqrt(logVisits / child.visits)
+            if score > bestScore:
+                bestScore = score
+                best = child
+        return best
+
+
+class MCTSPlayer(Player):
+    """
+    This class represents a player using Monte Carlo tree search with UCT
+    selection and random playouts. The subtree of the move actually
+    played is kept between turns, so search effort is not thrown away.
+    The cost per move is bounded by a node budget and/or a time budget.
+    """
+
+    def __init__(self, letter, nodeBudget=1000, timeBudget=None, exploration=1.41):
+        """
+        param letter: String, can only be 'X' or 'O'
+        param nodeBudget: Integer or None, tree iterations per move
+        param timeBudget: Float or None, seconds per move; at least one
+                          of the two budgets must be given
+        param exploration: Float, the UCT exploration constant
+        """
+        if nodeBudget is None and timeBudget is None:
+            raise ValueError('MCTSPlayer needs a node budget or a time budget')
+
+        super().__init__(letter, OTHER_AGENT)
+        self.nodeBudget = nodeBudget
+        self.timeBudget = timeBudget
+        # Budget of the next move set by a Tournament with time control
+        self.moveTimeBudget = None
+        self.exploration = exploration
+        self.root = None
+        self.rootCells = None
+
+    def setTimeBudget(self, seconds):
+        self.moveTimeBudget = seconds
+
+    def makeMove(self, board):
+        root = self.findRoot(board)
+        self.search(root, board)
+
+        # The most visited child is the most robust choice
+        best = max(root.children.values(), key=lambda child: child.visits)
+        board.makeMove(best.move, self.letter)
+
+        best.parent = None
+        self.root = best
+        self.rootCells = board.board[:]
+
+    def findRoot(self, board):
+        """
+        Reuses the subtree of the opponent's last move if the board
+        follows on from the previous search, otherwise starts a new tree.
+
+        param board: TicTacToe object
+        return: MCTSNode object
+        """
+        if self.root is not None:
+            changed = [i for i in range(9) if board.board[i] != self.rootCells[i]]
+            if len(changed) == 1 and self.rootCells[changed[0]] == '*' \
+                    and board.board[changed[0]] == self.opponent:
+                child = self.root.children.get(changed[0])
+                if child is not None:
+                    child.parent = None
+                    return child
+
+        return MCTSNode(None, board.lastMove, self.opponent, board)
+
+    def search(self, root, board):
+        """
+        Runs MCTS iterations from root until the node or time budget
+        is used up.
+
+        param root: MCTSNode object
+        param board: TicTacToe object, the position of root
+        """
+        deadline = None
+        budget = tightestBudget(self.timeBudget, self.moveTimeBudget)
+        if budget is not None:
+            deadline = time.perf_counter() + budget
+
+        iterations = 0
+        while root.untried or root.children:
+            # Always search at least once so there is a move to play
+            if root.children:
+                if self.nodeBudget is not None and iterations >= self.nodeBudget:
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+
+            self.iterate(root, board)
+            iterations += 1
+
+    def iterate(self, root, board):
+        """
+        Performs a single selection, expansion, playout and
+        backpropagation step.
+
+        param root: MCTSNode object
+        param board: TicTacToe object, the position of root
+        """
+        node = root
+        simulation = board.copy()
+
+        # Selection
+        while not node.untried and node.children:
+            node = node.selectChild(self.exploration)
+            simulation.makeMove(node.move, node.letter)
+
+        # Expansion
+        if node.untried:
+            letter = 'O' if node.letter == 'X' else 'X'
+            move = node.untried.pop()
+            simulation.makeMove(move, letter)
+            child = MCTSNode(node, move, letter, simulation)
+            node.children[move] = child
+            node = child
+
+        # Playout
+        letter = node.letter
+        while not simulation.isGameOver():
+            letter = 'O' if letter == 'X' else 'X'
+            simulation.makeMove(random.choice(simulation.remainingMoves), letter)
+
+        if simulation.isGameWon('X'):
+            winner = 'X'
+        elif simulation.isGameWon('O'):
+            winner = 'O'
+        else:
+            winner = None
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.letter:
+                node.wins += 1
+            node = node.parent
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget has run out.
+    """
+
+
+class NegamaxPlayer(Player):
+    """
+    This class represents a player using iterative-deepening negamax with
+    alpha-beta pruning. Positions beyond the search depth are scored by a
+    heuristic based on open lines, moves are ordered by the transposition
+    table, killer moves and the history heuristic, and the search stops
+    when its time budget runs out, playing the best move of the last
+    completed depth.
+    """
+
+    WIN_SCORE = 1000
+    # Weight of an open line holding zero, one or two of a player's marks
+    LINE_WEIGHTS = [0, 1, 10, 0]
+    # How many nodes are searched between two looks at the clock
+    CLOCK_INTERVAL = 256
+
+    def __init__(self, letter, timeBudget=1.0, maxDepth=None, table=None):
+        """
+        param letter: String, can only be 'X' or 'O'
+        param timeBudget: Float or None, seconds per move
+        param maxDepth: Integer or None, deepest iteration (None: to the end)
+        param table: Dictionary or None, transposition table; pass the same
+                     dictionary to several players to share it
+        """
+        super().__init__(letter, OTHER_AGENT)
+        self.timeBudget = timeBudget
+        # Budget of the next move set by a Tournament with time control
+        self.moveTimeBudget = None
+        self.maxDepth = maxDepth
+        self.table = {} if table is None else table
+        self.history = {'X': [0] * 9, 'O': [0] * 9}
+        self.killers = []
+        self.deadline = None
+        self.nodes = 0
+        self.completedDepth = 0
+
+    def setTimeBudget(self, seconds):
+        self.moveTimeBudget = seconds
+
+    def makeMove(self, board):
+        move = self.getBestMove(board)
+        board.makeMove(move, self.letter)
+
+    def getBestMove(self, board):
+        """
+        Runs the iterative deepening search.
+
+        param board: TicTacToe object
+        return: Integer, the move to play
+        """
+        self.deadline = None
+        budget = tightestBudget(self.timeBudget, self.moveTimeBudget)
+        if budget is not None:
+            self.deadline = time.perf_counter() + budget
+
+        self.nodes = 0
+        self.completedDepth = 0
+        remaining = len(board.remainingMoves)
+        maxDepth = remaining if self.maxDepth is None else min(self.maxDepth, remaining)
+        self.killers = [[None, None] for _ in range(remaining + 1)]
+
+        work = board.copy()
+        bestMove = work.remainingMoves[0]
+
+        for depth in range(1, maxDepth + 1):
+            try:
+                value, move = self.searchRoot(work, depth)
+            except SearchTimeout:
+                break
+
+            bestMove = move
+            self.completedDepth = depth
+
+            # A forced win or loss can not change with a deeper search
+            if abs(value) > self.WIN_SCORE - 100:
+                break
+
+        return bestMove
+
+    def searchRoot(self, board, depth):
+        """
+        Searches every root move to the given depth.
+
+        param board: TicTacToe object
+        param depth: Integer
+        return: Tuple (value, move)
+        """
+        alpha = -float('inf')
+        beta = float('inf')
+        bestMove = None
+        lastMove = board.lastMove
+
+        for move in self.orderMoves(board, 0, self.letter):
+            board.makeMove(move, self.letter)
+            value = -self.negamax(board, depth - 1, 1, -beta, -alpha, self.opponent, move)
+            board.undoMove(move, lastMove)
+
+            if bestMove is None or value > alpha:
+                alpha = value
+                bestMove = move
+
+        self.store(board, self.letter, depth, alpha, 0, bestMove, 0)
+        return alpha, bestMove
+
+    def negamax(self, board, depth, ply, alpha, beta, letter, lastMove):
+        """
+        Alpha-beta negamax search; the value is from the point of view of
+        the player to move (letter).
+
+        param board: TicTacToe object
+        param depth: Integer, remaining search depth
+        param ply: Integer, distance from the root
+        param alpha: Float
+        param beta: Float
+        param letter: String, the player to move
+        param lastMove: Integer, the move that led to this position
+        return: Float
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.completedDepth > 0 \
+                and self.nodes % self.CLOCK_INTERVAL == 0 \
+                and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+        opponent = 'O' if letter == 'X' else 'X'
+
+        # The player who just moved may have won
+        for line in LINES_THROUGH[lastMove]:
+            if board.board[line[0]] == board.board[line[1]] == board.board[line[2]] == opponent:
+                return -(self.WIN_SCORE - ply)
+
+        if not board.remainingMoves:
+            return 0
+
+        if depth == 0:
+            return self.evaluate(board, letter)
+
+        originalAlpha = alpha
+        tableMove = None
+        entry = self.table.get(("".join(board.board), letter))
+        if entry is not None:
+            entryDepth, entryValue, entryFlag, tableMove = entry
+            if entryDepth >= depth:
+                entryValue = self.fromTable(entryValue, ply)
+                if entryFlag == 0:
+                    return entryValue
+                if entryFlag < 0:
+                    beta = min(beta, entryValue)
+                else:
+                    alpha = max(alpha, entryValue)
+                if alpha >= beta:
+                    return entryValue
+
+        bestValue = -float('inf')
+        bestMove = None
+
+        for move in self.orderMoves(board, ply, letter, tableMove):
+            board.makeMove(move, letter)
+            value = -self.negamax(board, depth - 1, ply + 1, -beta, -alpha, opponent, move)
+            board.undoMove(move, lastMove)
+
+            if value > bestValue:
+                bestValue = value
+                bestMove = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                # Remember the move that refuted this position
+                killers = self.killers[ply]
+                if move != killers[0]:
+                    killers[1] = killers[0]
+                    killers[0] = move
+                self.history[letter][move] += depth * depth
+                break
+
+        if bestValue <= originalAlpha:
+            flag = -1
+        elif bestValue >= beta:
+            flag = 1
+        else:
+            flag = 0
+        self.store(board, letter, depth, bestValue, flag, bestMove, ply)
+
+        return bestValue
+
+    def orderMoves(self, board, ply, letter, tableMove=None):
+        """
+        Orders moves: transposition table move, killer moves, then by
+        history score.
+
+        param board: TicTacToe object
+        param ply: Integer
+        param letter: String, the player to move
+        param tableMove: Integer or None
+        return: List of Integers
+        """
+        if tableMove is None and ply == 0:
+            entry = self.table.get(("".join(board.board), letter))
+            if entry is not None:
+                tableMove = entry[3]
+
+        killers = self.killers[ply]
+        history = self.history[letter]
+
+        def priority(move):
+            if move == tableMove:
+                return 3, 0
+            if move == killers[0]:
+                return 2, 0
+            if move == killers[1]:
+                return 1, 0
+            return 0, history[move]
+
+        return sorted(board.remainingMoves, key=priority, reverse=True)
+
+    def evaluate(self, board, letter):
+        """
+        Heuristic value of a non-terminal position for the player to move:
+        lines still open to a player count for that player, weighted by
+        how many of its marks they hold.
+
+        param board: TicTacToe object
+        param letter: String, the player to move
+        return: Integer
+        """
+        opponent = 'O' if letter == 'X' else 'X'
+        score = 0
+        for line in WINNING_LINES:
+            values = [board.board[i] for i in line]
+            mine = values.count(letter)
+            theirs = values.count(opponent)
+            if theirs == 0:
+                score += self.LINE_WEIGHTS[mine]
+            elif mine == 0:
+                score -= self.LINE_WEIGHTS[theirs]
+        return score
+
+    def store(self, board, letter, depth, value, flag, move, ply):
+        """
+        Stores a search result in the transposition table, keeping the
+        deeper of two results for the same position. Win and loss scores
+        are stored relative to the position rather than the root.
+        """
+        key = ("".join(board.board), letter)
+        entry = self.table.get(key)
+        if entry is None or entry[0] <= depth:
+            self.table[key] = (depth, self.toTable(value, ply), flag, move)
+
+    def toTable(self, value, ply):
+        if value > self.WIN_SCORE - 100:
+            return value + ply
+        if value < -(self.WIN_SCORE - 100):
+            return value - ply
+        return value
+
+    def fromTable(self, value, ply):
+        if value > self.WIN_SCORE - 100:
+            return value - ply
+        if value < -(self.WIN_SCORE - 100):
+            return value + ply
+        return value
@@ -0,0 +1,297 @@
+"""
+Benchmark suite for the tictactoe engine, the agents, training and
+policy I/O.
+
+Results are written as JSON together with the environment they were
+measured in. Given a baseline file, the run fails (exit status 1) if any
+measurement regressed by more than the threshold.
+
+    python3 benchmark.py                          # run, write bench_output.json
+    python3 benchmark.py --save-baseline base.json
+    python3 benchmark.py --baseline base.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import TicTacToe as ttt
+
+# Opponents train() is benchmarked against, with the number of episodes
+# per measurement (minimax is far slower than the scripted bots)
+OPPONENTS = [
+    ('Random', ttt.Player, 2000),
+    ('minAndMAx', ttt.minAndMAx, 20),
+    ('WinSeekingBot', ttt.WinSeekingBot, 2000),
+    ('StrategicAgent', ttt.StrategicAgent, 2000),
+    ('DiagonalWinBot', ttt.DiagonalWinBot, 2000),
+    ('ForkPreventionBot', ttt.ForkPreventionBot, 500),
+]
+
+HIGHER = 'higher'
+LOWER = 'lower'
+
+
+def bestOf(repeat, function):
+    """
+    Runs function repeat times and returns the shortest run time, which
+    is the least disturbed by other work on the machine.
+
+    param repeat: Integer
+    param function: Callable without arguments
+    return: Float, seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def randomGames(count):
+    """
+    Plays count games of random moves and returns the boards after each
+    move, to feed the engine benchmarks with realistic positions.
+
+    param count: Integer
+    return: List of TicTacToe objects
+    """
+    boards = []
+    for _ in range(count):
+        board = ttt.TicTacToe()
+        letter = 'X'
+        while not board.isGameOver():
+            board.makeMove(random.choice(board.remainingMoves), letter)
+            boards.append(board.copy())
+            letter = 'O' if letter == 'X' else 'X'
+    return boards
+
+
+def benchEngine(repeat, scale):
+    """
+    Measures raw TicTacToe move, game-over and copy throughput.
+    """
+    games = 1000 * scale
+    positions = randomGames(200)
+
+    def moves():
+        for _ in range(games):
+            board = ttt.TicTacToe()
+            letter = 'X'
+            for location in (4, 0, 8, 2, 6, 1, 7, 3, 5):
+                board.makeMove(location, letter)
+                letter = 'O' if letter == 'X' else 'X'
+
+    def gameOver():
+        for _ in range(5 * scale):
+            for board in positions:
+                board.isGameOver()
+
+    def copies():
+        for _ in range(5 * scale):
+            for board in positions:
+                board.copy()
+
+    checks = 5 * scale * len(positions)
+    return [
+        ('engine.makeMove', 9 * games / bestOf(repeat, moves), 'moves/s', HIGHER),
+        ('engine.isGameOver', checks / bestOf(repeat, gameOver), 'calls/s', HIGHER),
+        ('engine.copy', checks / bestOf(repeat, copies), 'copies/s', HIGHER),
+    ]
+
+
+def benchTraining(repeat, scale):
+    """
+    Measures train() episodes per second against each opponent type.
+    """
+    results = []
+    for name, opponentClass, episodes in OPPONENTS:
+        episodes *= scale
+
+        def run():
+            agent = ttt.RLPlayer('X')
+            agent.initTraining(0.8, 0.7, 0.3)
+            ttt.train(agent, opponentClass('O'), episodes)
+
+        results.append((f'train.{name}', episodes / bestOf(repeat, run), 'episodes/s', HIGHER))
+    return results
+
+
+def trainedAgent():
+    """
+    Returns an RL agent trained briefly against a random player, in
+    playing mode.
+    """
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.8, 0.7, 0.3)
+    ttt.train(agent, ttt.Player('O'), 5000)
+    agent.setMode(ttt.PLAYING_MODE)
+    return agent
+
+
+def benchAgents(repeat, scale):
+    """
+    Measures RLPlayer.getRLMove latency and minAndMAx first-move latency.
+    """
+    agent = trainedAgent()
+    calls = 2000 * scale
+    empty = ttt.TicTacToe()
+
+    def rlMoves():
+        for _ in range(calls):
+            # Invalidate the playing-mode move cache so every call selects a move
+            agent.policyVersion += 1
+            agent.getRLMove(empty.copy())
+
+    def minimaxFirstMove():
+        ttt.minAndMAx('X').getBestMove(ttt.TicTacToe())
+
+    return [
+        ('agent.getRLMove', 1e6 * bestOf(repeat, rlMoves) / calls, 'us/move', LOWER),
+        ('agent.minAndMAx.firstMove', 1e3 * bestOf(repeat, minimaxFirstMove), 'ms/move', LOWER),
+    ]
+
+
+def benchPolicyIO(repeat, scale):
+    """
+    Measures RLPlayer.save and RLPlayer._load for a policy file.
+    """
+    agent = trainedAgent()
+    fileName = os.path.join(tempfile.mkdtemp(), 'policy.txt')
+
+    def save():
+        for _ in range(scale):
+            agent.save(fileName)
+
+    def load():
+        for _ in range(scale):
+            ttt.RLPlayer('X')._load(fileName)
+
+    results = [
+        ('policy.save', 1e3 * bestOf(repeat, save) / scale, 'ms', LOWER),
+        ('policy.load', 1e3 * bestOf(repeat, load) / scale, 'ms', LOWER),
+        ('policy.entries', len(agent.valueFunction), 'entries', None),
+    ]
+    os.remove(fileName)
+    return results
+
+
+SUITES = {
+    'engine': benchEngine,
+    'training': benchTraining,
+    'agents': benchAgents,
+    'io': benchPolicyIO,
+}
+
+
+def environment():
+    """
+    Describes the machine and code version the benchmark ran on.
+
+    return: Dictionary
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'commit': commit or None,
+    }
+
+
+def run(suites, repeat, scale):
+    """
+    Runs the selected suites.
+
+    param suites: List of suite names
+    param repeat: Integer, runs per measurement (the best one counts)
+    param scale: Integer, multiplies the work per run
+    return: Dictionary, the report
+    """
+    results = {}
+    for suite in suites:
+        for name, value, unit, better in SUITES[suite](repeat, scale):
+            results[name] = {'value': value, 'unit': unit, 'better': better}
+            print(f'{name:<32} {value:>14.3f} {unit}')
+
+    return {'environment': environment(), 'repeat': repeat, 'scale': scale, 'results': results}
+
+
+def compare(report, baseline, threshold):
+    """
+    Compares a report with a baseline report.
+
+    param report: Dictionary
+    param baseline: Dictionary
+    param threshold: Float, allowed relative regression, e.g. 0.2 for 20%
+    return: List of regression messages, empty if there are none
+    """
+    regressions = []
+    print()
+    print(f'{"Benchmark":<32} {"Baseline":>14} {"Current":>14} {"Change":>9}')
+    print('-' * 72)
+
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or result['better'] is None or old['value'] == 0:
+            continue
+
+        change = (result['value'] - old['value']) / old['value']
+        worse = -change if result['better'] == HIGHER else change
+        flag = '  REGRESSION' if worse > threshold else ''
+        print(f'{name:<32} {old["value"]:>14.3f} {result["value"]:>14.3f} {change:>+8.1%}{flag}')
+
+        if worse > threshold:
+            regressions.append(f'{name}: {old["value"]:.3f} -> {result["value"]:.3f} {result["unit"]}')
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the tictactoe engine, agents, training and I/O.')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help='suite to run, may be repeated (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best counts')
+    parser.add_argument('--scale', type=int, default=1, help='multiplies the work per run')
+    parser.add_argument('--output', default='bench_output.json', help='where to write the results')
+    parser.add_argument('--baseline', help='baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative regression that fails the run (default: 0.2)')
+    parser.add_argument('--save-baseline', help='also write the results to this baseline file')
+    args = parser.parse_args(argv)
+
+    report = run(args.suite or list(SUITES), args.repeat, args.scale)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as out:
+            json.dump(report, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as data:
+            baseline = json.load(data)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:')
+            for message in regressions:
+                print('  ' + message)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
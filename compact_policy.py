@@ -0,0 +1,60 @@
+"""
+Compacts a policy file.
+
+Policy files are full of entries fixed at 0 (valueOfState stores a 0 on
+every lookup of an unseen state) and of states that are never decision
+points, such as full boards. This keeps only the reachable afterstates
+that were actually updated, and those that end a game (see
+TicTacToe.compactTable). The result is written next to the input, as
+<input>.compact.txt, unless an output is given, and is loaded as usual:
+
+    agent._load('cse_policy_hw2.compact.txt')
+
+--drop-terminal also drops the afterstates that end a game. An agent in
+the default mode would then never take an immediate win, so play such a
+table in sparse mode, which values them by their reward:
+
+    agent.setSparse()
+
+    python3 compact_policy.py [input] [output] [--drop-terminal]
+"""
+import argparse
+import os
+import sys
+
+import TicTacToe as ttt
+
+
+def defaultOutput(path):
+    """
+    param path: String, the policy file to compact
+    return: String, where its compacted table is written by default
+    """
+    root, extension = os.path.splitext(path)
+    return f'{root}.compact{extension or ".txt"}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prune unreachable and never-updated states from a policy file.')
+    parser.add_argument('input', nargs='?', default=ttt.POLICY_FILE, help='policy file to compact')
+    parser.add_argument('output', nargs='?', help='where to write the result (default: <input>.compact.txt)')
+    parser.add_argument('--drop-terminal', action='store_true',
+                        help='drop the afterstates that end a game; play the result in sparse mode')
+    args = parser.parse_args(argv)
+
+    agent = ttt.RLPlayer('X')
+    agent._load(args.input)
+    before = len(agent.valueFunction)
+    size = os.path.getsize(args.input)
+
+    agent.valueFunction = ttt.compactTable(agent.valueFunction, args.drop_terminal)
+    output = args.output or defaultOutput(args.input)
+    agent.save(output)
+
+    print(f'{args.input}: {before} entries, {size} bytes -> '
+          f'{output}: {len(agent.valueFunction)} entries, {os.path.getsize(output)} bytes')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Hyperband / successive-halving search over RLPlayer hyper-parameters.
+
+Instead of giving every (learning, discount, epsilon) configuration the
+full training budget (see punch.py), many configurations are trained
+briefly, evaluated with a short tournament and only the best 1/eta of
+them are continued, from their checkpoint, with eta times the budget.
+"""
+import math
+import os
+import random
+import tempfile
+
+import TicTacToe as ttt
+
+CHECKPOINT_DIR = 'hyperband_checkpoints'
+
+
+class Trial:
+    """
+    A single hyper-parameter configuration and its training progress.
+    """
+
+    def __init__(self, trialId, learning, discount, epsilon, checkpointDir=CHECKPOINT_DIR):
+        """
+        param trialId: Integer, unique id of the trial
+        param learning: Float (0..1)
+        param discount: Float (0..1)
+        param epsilon: Float (0..1)
+        param checkpointDir: String, directory for the trial's policy file
+        """
+        self.trialId = trialId
+        self.learning = learning
+        self.discount = discount
+        self.epsilon = epsilon
+        self.episodes = 0
+        self.score = 0.0
+        self.checkpoint = os.path.join(checkpointDir, f'trial_{trialId}.txt')
+
+    def loadAgent(self):
+        """
+        Creates the trial's RL agent and restores it from its checkpoint,
+        if the trial has been trained before.
+
+        return: RLPlayer object
+        """
+        agent = ttt.createPlayer('X', ttt.RL_AGENT)
+        agent.name = f'Trial {self.trialId}'
+        if self.episodes > 0:
+            agent._load(self.checkpoint)
+        return agent
+
+
+def sampleConfig():
+    """
+    Samples a configuration from the same range punch.py searches.
+
+    return: Tuple (learning, discount, epsilon)
+    """
+    return (random.randint(100000, 999999) / 1000000,
+            random.randint(100000, 999999) / 1000000,
+            random.randint(100000, 999999) / 1000000)
+
+
+def evaluate(agent, partner, games):
+    """
+    Plays a short tournament in both seats and returns the score of the
+    agent, counting a win as 1 and a draw as 0.5.
+
+    param agent: RLPlayer object
+    param partner: Player object
+    param games: Integer, number of games in each seat
+    return: Float (0..1)
+    """
+    agent.setMode(ttt.PLAYING_MODE)
+    won, drawn = agent.gamesW, agent.gamesD
+
+    tournament = ttt.Tournament()
+    tournament.start(agent, partner, games)
+    tournament.start(partner, agent, games)
+
+    won = agent.gamesW - won
+    drawn = agent.gamesD - drawn
+    return (won + 0.5 * drawn) / (2 * games)
+
+
+def trainTrial(trial, partner, episodes, evalGames):
+    """
+    Continues a trial from its checkpoint until it has been trained for
+    the given number of episodes, then evaluates and checkpoints it.
+
+    param trial: Trial object
+    param partner: Player object
+    param episodes: Integer, total training budget of the trial so far
+    param evalGames: Integer, evaluation games in each seat
+    """
+    agent = trial.loadAgent()
+    remaining = episodes - trial.episodes
+
+    # Train in both seats, as the training scripts do
+    agent.initTraining(trial.learning, trial.discount, trial.epsilon)
+    ttt.train(agent, partner, remaining // 2)
+    agent.initTraining(trial.learning, trial.discount, trial.epsilon)
+    ttt.train(partner, agent, remaining - remaining // 2)
+
+    trial.episodes = episodes
+    trial.score = evaluate(agent, partner, evalGames)
+    agent.save(trial.checkpoint)
+
+
+def successiveHalving(trials, partner, minEpisodes, eta=3, evalGames=20, rungs=None):
+    """
+    Runs successive halving: all trials are trained with minEpisodes,
+    the best 1/eta are kept and trained with eta times the budget, until
+    a single trial remains or the number of rungs is used up.
+
+    param trials: List of Trial objects
+    param partner: Player object
+    param minEpisodes: Integer, budget of the first rung
+    param eta: Integer, reduction factor between rungs
+    param evalGames: Integer, evaluation games in each seat
+    param rungs: Integer or None, maximum number of rungs
+    return: Trial object, the best trial
+    """
+    episodes = minEpisodes
+    rung = 1
+
+    while True:
+        for trial in trials:
+            trainTrial(trial, partner, episodes, evalGames)
+
+        trials.sort(key=lambda t: t.score, reverse=True)
+        print(f"Rung: {len(trials)} trials, {episodes} episodes, best score = {trials[0].score:.3f}")
+
+        keep = len(trials) // eta
+        if keep < 1 or rung == rungs:
+            return trials[0]
+
+        trials = trials[:keep]
+        episodes *= eta
+        rung += 1
+
+
+def hyperband(partner, maxEpisodes=27000, minEpisodes=1000, eta=3, evalGames=20, checkpointDir=CHECKPOINT_DIR):
+    """
+    Runs the Hyperband schedule: several successive-halving brackets
+    which trade off the number of configurations against the budget
+    each configuration starts with.
+
+    param partner: Player object to train and evaluate against
+    param maxEpisodes: Integer, largest budget given to a configuration
+    param minEpisodes: Integer, smallest budget given to a configuration
+    param eta: Integer, reduction factor between rungs
+    param evalGames: Integer, evaluation games in each seat
+    param checkpointDir: String, directory for the trial checkpoints; every
+            call keeps them in a new subdirectory
+    return: List of (learning, discount, epsilon, score, episodes) tuples,
+            best first
+    """
+    os.makedirs(checkpointDir, exist_ok=True)
+    runDir = tempfile.mkdtemp(prefix='run_', dir=checkpointDir)
+    results = []
+
+    sMax = int(math.log(maxEpisodes / minEpisodes, eta) + 1e-9)
+    trialId = 0
+
+    for s in range(sMax, -1, -1):
+        n = math.ceil((sMax + 1) / (s + 1) * eta ** s)
+        episodes = maxEpisodes // eta ** s
+
+        trials = []
+        for _ in range(n):
+            trials.append(Trial(trialId, *sampleConfig(), checkpointDir=runDir))
+            trialId += 1
+
+        print(f"Bracket {s}: {n} configurations starting with {episodes} episodes")
+        best = successiveHalving(trials, partner, episodes, eta, evalGames, s + 1)
+
+        config = (best.learning, best.discount, best.epsilon, best.score, best.episodes)
+        results.append(config)
+        print(f"Configuration: Rate = {best.learning}, dis_rate = {best.discount}, "
+              f"et_rate = {best.epsilon}, Score = {best.score:.3f}")
+
+    results.sort(key=lambda x: x[3], reverse=True)
+    return results
+
+
+if __name__ == "__main__":
+    partner = ttt.createPlayer('O', ttt.RANDOM_AGENT)
+    partner.name = "Random"
+    hyperband(partner)
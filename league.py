@@ -0,0 +1,211 @@
+"""
+League training against frozen historical snapshots.
+
+Self-play against only the latest policy tends to cycle. Here the agent
+trains against a pool of frozen copies of its own earlier value tables.
+The copies are stored in the compact binary format and played from
+memory-mapped files (see TicTacToe.SnapshotPlayer). Opponents are drawn
+by prioritized fictitious self-play: the more often the agent currently
+loses to a snapshot, the more often it is drawn. Matches run on a
+worker pool and send the agent's trajectories back for learning. The
+pool has a capacity limit, beyond which the stalest snapshot (the one
+the agent loses to least, oldest first) is evicted.
+
+    python3 league.py [episodes]
+"""
+import collections
+import multiprocessing
+import os
+import random
+import sys
+
+import TicTacToe as ttt
+from selfplay import gameReward
+
+SNAPSHOT_DIR = 'league_snapshots'
+
+
+class Snapshot:
+    """
+    A frozen value table in the pool and the agent's recent results
+    against it.
+    """
+
+    def __init__(self, snapshotId, path, episode, window):
+        """
+        param snapshotId: Integer
+        param path: String, the binary policy file
+        param episode: Integer, training episode the snapshot was taken at
+        param window: Integer, number of recent games the loss rate
+                is computed over
+        """
+        self.snapshotId = snapshotId
+        self.path = path
+        self.episode = episode
+        self.results = collections.deque(maxlen=window)
+        self.games = 0
+
+    def lossRate(self):
+        """
+        Returns the agent's recent loss rate against the snapshot,
+        smoothed so that a new snapshot starts at 0.5.
+
+        return: Float (0..1)
+        """
+        return (sum(self.results) + 1) / (len(self.results) + 2)
+
+
+def playMatch(args):
+    """
+    Worker process entry point: plays the agent against a snapshot, in
+    both seats, and returns the trajectories of both players; the
+    snapshot's are needed to find the final board when it moved last.
+
+    param args: Tuple (valueFunction, path, games, epsilon, seed)
+    return: List of (winner letter or None, {letter: afterstate keys})
+    """
+    valueFunction, path, games, epsilon, seed = args
+    random.seed(seed)
+
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.0, 0.0, epsilon)
+    agent.valueFunction = valueFunction
+    opponent = ttt.SnapshotPlayer('O', path)
+
+    results = []
+    for game in range(games):
+        if game % 2 == 0:
+            winner, trajectories = ttt.selfPlayEpisode(agent, opponent)
+        else:
+            winner, trajectories = ttt.selfPlayEpisode(opponent, agent)
+        results.append((winner.letter if winner else None, trajectories))
+
+    opponent.close()
+    return results
+
+
+class League:
+    """
+    Trains an RL agent against a pool of its own frozen snapshots.
+    """
+
+    def __init__(self, agent, capacity=10, snapshotEvery=5000, matchGames=50, matchesPerRound=8,
+                 priority=2.0, window=200, epsilon=0.1, snapshotDir=SNAPSHOT_DIR, processes=None):
+        """
+        param agent: RLPlayer object, trained in place; its letter is
+                irrelevant, keys are taken from its own perspective
+        param capacity: Integer, largest number of snapshots in the pool
+        param snapshotEvery: Integer, training games between two snapshots
+        param matchGames: Integer, games per match
+        param matchesPerRound: Integer, matches played in parallel per round
+        param priority: Float, exponent of the loss rate in the sampling
+                weights; 0 samples uniformly
+        param window: Integer, recent games per snapshot the loss rate
+                is computed over
+        param epsilon: Float (0..1), exploration rate of the agent
+        param snapshotDir: String, directory for the snapshot files
+        param processes: Integer or None, worker processes (None: all cores)
+        """
+        self.agent = agent
+        self.capacity = capacity
+        self.snapshotEvery = snapshotEvery
+        self.matchGames = matchGames
+        self.matchesPerRound = matchesPerRound
+        self.priority = priority
+        self.window = window
+        self.epsilon = epsilon
+        self.snapshotDir = snapshotDir
+        self.processes = processes
+
+        self.pool = []
+        self.nextId = 0
+        self.episodes = 0
+        self.sinceSnapshot = 0
+
+    def addSnapshot(self):
+        """
+        Freezes the agent's current table into the pool, evicting the
+        stalest snapshot if the pool is full.
+        """
+        path = os.path.join(self.snapshotDir, f'snapshot_{self.nextId}.bin')
+        self.agent.saveBinary(path)
+        self.pool.append(Snapshot(self.nextId, path, self.episodes, self.window))
+        self.nextId += 1
+        self.sinceSnapshot = 0
+
+        if len(self.pool) > self.capacity:
+            # The newest snapshot is never evicted
+            stale = min(self.pool[:-1], key=lambda s: (s.lossRate(), s.episode))
+            self.pool.remove(stale)
+            os.remove(stale.path)
+
+    def weights(self):
+        """
+        return: List of Floats, the sampling weight of each snapshot
+        """
+        return [snapshot.lossRate() ** self.priority for snapshot in self.pool]
+
+    def run(self, episodes):
+        """
+        Trains the agent for a number of games.
+
+        param episodes: Integer
+        return: RLPlayer object, the agent
+        """
+        os.makedirs(self.snapshotDir, exist_ok=True)
+        if not self.pool:
+            self.addSnapshot()
+
+        with multiprocessing.Pool(self.processes) as workers:
+            while self.episodes < episodes:
+                opponents = random.choices(self.pool, self.weights(), k=self.matchesPerRound)
+                table = dict(self.agent.valueFunction)
+                jobs = [(table, snapshot.path, self.matchGames, self.epsilon, random.getrandbits(32))
+                        for snapshot in opponents]
+
+                for snapshot, results in zip(opponents, workers.map(playMatch, jobs)):
+                    for winner, trajectories in results:
+                        # Only the agent learns, not the snapshot
+                        self.agent.learnFromTrajectory(trajectories['X'],
+                                                       gameReward(self.agent, winner, trajectories, 'X'))
+                        snapshot.results.append(1 if winner == 'O' else 0)
+                    snapshot.games += len(results)
+                    self.episodes += len(results)
+                    self.sinceSnapshot += len(results)
+
+                if self.sinceSnapshot >= self.snapshotEvery:
+                    self.addSnapshot()
+                    print(f'Episode {self.episodes}: {len(self.pool)} snapshots, loss rates '
+                          + ' '.join(f'{s.snapshotId}:{s.lossRate():.2f}' for s in self.pool))
+
+        return self.agent
+
+    def close(self):
+        """
+        Deletes the snapshot files.
+        """
+        for snapshot in self.pool:
+            os.remove(snapshot.path)
+        self.pool = []
+
+
+if __name__ == "__main__":
+    agent = ttt.RLPlayer('X')
+    agent.name = 'League Agent'
+    agent.initTraining(0.2, 0.9, 0.1)
+
+    league = League(agent)
+    league.run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
+    league.close()
+    agent.save()
+
+    agent.setMode(ttt.PLAYING_MODE)
+    players = [agent]
+    tournament = ttt.Tournament()
+    for name, opponentClass in [('Random', ttt.Player), ('minAndMAx', ttt.minAndMAx)]:
+        opponent = opponentClass(agent.opponent)
+        opponent.name = name
+        tournament.start(agent, opponent, 30)
+        tournament.start(opponent, agent, 30)
+        players.append(opponent)
+    tournament.printStats(players)
@@ -0,0 +1,67 @@
+"""
+Hyper-parameter search over (learning rate, discount) from shared games.
+
+punch.py simulates separate games for every configuration, even though
+the opponent is the same. Here one stream of games against a fixed
+opponent updates K value tables at once, each with its own learning
+rate and discount (see TicTacToe.trainShared), so the games are
+simulated once for all K configurations. The exploration rate belongs
+to the stream, not to a configuration: it is the epsilon of the first
+learner, which plays the games.
+
+    python3 multilearner.py [configurations] [episodes]
+"""
+import sys
+
+import TicTacToe as ttt
+from hyperband import evaluate, sampleConfig
+
+
+def createLearners(configs, epsilon):
+    """
+    param configs: List of (learning, discount) tuples
+    param epsilon: Float (0..1), exploration rate of the game stream
+    return: List of RLPlayer objects
+    """
+    learners = []
+    for i, (learning, discount) in enumerate(configs):
+        learner = ttt.RLPlayer('X')
+        learner.name = f'Config {i}'
+        learner.initTraining(learning, discount, epsilon)
+        learners.append(learner)
+    return learners
+
+
+def search(partner, configurations=16, episodes=20000, epsilon=0.3, evalGames=50):
+    """
+    Trains a number of configurations from shared games and ranks them.
+
+    param partner: Player object to train and evaluate against
+    param configurations: Integer, number of configurations (K)
+    param episodes: Integer, shared training games
+    param epsilon: Float (0..1)
+    param evalGames: Integer, evaluation games in each seat
+    return: List of (learning, discount, score) tuples, best first
+    """
+    # The exploration rate of a sampled configuration is not used
+    configs = [sampleConfig()[:2] for _ in range(configurations)]
+    learners = createLearners(configs, epsilon)
+    ttt.trainShared(learners, partner, episodes)
+
+    results = []
+    for (learning, discount), learner in zip(configs, learners):
+        score = evaluate(learner, partner, evalGames)
+        results.append((learning, discount, score))
+        print(f"Configuration: Rate = {learning}, dis_rate = {discount}, Score = {score:.3f}")
+
+    results.sort(key=lambda x: x[2], reverse=True)
+    return results
+
+
+if __name__ == "__main__":
+    partner = ttt.createPlayer('O', ttt.RANDOM_AGENT)
+    partner.name = "Random"
+    results = search(partner,
+                     int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    print("Best configuration:", results[0])
@@ -0,0 +1,195 @@
+"""
+Population-based training of RLPlayer hyper-parameters.
+
+A population of RL agents is trained in parallel worker processes.
+After every interval the members play a round robin against each other;
+the weakest members copy the value table of the strongest ones and
+perturb the copied hyper-parameters. The history of each member is the
+learned (learning, discount, epsilon) schedule which training.py
+otherwise hard-codes session by session.
+"""
+import multiprocessing
+import random
+
+import TicTacToe as ttt
+
+# Scripted partners the population trains against, cycled per interval
+PARTNERS = [
+    ('Random', ttt.Player),
+    ('WinSeeker', ttt.WinSeekingBot),
+    ('StrategyBot', ttt.StrategicAgent),
+    ('DiagonalWinBot', ttt.DiagonalWinBot),
+]
+
+PERTURB_FACTORS = [0.8, 1.2]
+
+
+class Member:
+    """
+    A member of the population: a value table and its hyper-parameters.
+    """
+
+    def __init__(self, memberId, learning, discount, epsilon):
+        """
+        param memberId: Integer
+        param learning: Float (0..1)
+        param discount: Float (0..1)
+        param epsilon: Float (0..1)
+        """
+        self.memberId = memberId
+        self.learning = learning
+        self.discount = discount
+        self.epsilon = epsilon
+        self.valueFunction = {}
+        self.score = 0.0
+        self.history = []
+
+    def createAgent(self, letter):
+        """
+        Creates an RL agent which plays with this member's value table.
+
+        param letter: String, 'X' or 'O'
+        return: RLPlayer object
+        """
+        agent = ttt.RLPlayer(letter)
+        agent.name = f'Member {self.memberId}'
+        agent.valueFunction = self.valueFunction
+        return agent
+
+
+def trainMember(args):
+    """
+    Worker process entry point: trains a value table against a scripted
+    partner in both seats.
+
+    param args: Tuple (valueFunction, learning, discount, epsilon,
+                partnerIndex, episodes, seed)
+    return: Dictionary, the trained value table
+    """
+    valueFunction, learning, discount, epsilon, partnerIndex, episodes, seed = args
+    random.seed(seed)
+
+    agent = ttt.RLPlayer('X')
+    agent.valueFunction = valueFunction
+    partner = PARTNERS[partnerIndex][1]('O')
+
+    agent.initTraining(learning, discount, epsilon)
+    ttt.train(agent, partner, episodes // 2)
+    agent.initTraining(learning, discount, epsilon)
+    ttt.train(partner, agent, episodes - episodes // 2)
+
+    return agent.valueFunction
+
+
+def roundRobin(population, games):
+    """
+    Plays every member against every other member in both seats and
+    stores the score (1 per win, 0.5 per draw, per game played) on
+    each member.
+
+    param population: List of Member objects
+    param games: Integer, games per pairing and seat
+    """
+    points = {member.memberId: 0.0 for member in population}
+    played = {member.memberId: 0 for member in population}
+    tournament = ttt.Tournament()
+
+    for a in population:
+        for b in population:
+            if a is b:
+                continue
+
+            p1 = a.createAgent('X')
+            p2 = b.createAgent('O')
+            tournament.start(p1, p2, games)
+
+            points[a.memberId] += p1.gamesW + 0.5 * p1.gamesD
+            points[b.memberId] += p2.gamesW + 0.5 * p2.gamesD
+            played[a.memberId] += games
+            played[b.memberId] += games
+
+    for member in population:
+        member.score = points[member.memberId] / max(played[member.memberId], 1)
+
+
+def perturb(value):
+    """
+    Multiplies a hyper-parameter by a random perturbation factor and
+    keeps it within (0..1).
+
+    param value: Float
+    return: Float
+    """
+    return min(max(value * random.choice(PERTURB_FACTORS), 0.01), 0.99)
+
+
+def exploitAndExplore(population, fraction):
+    """
+    Replaces the bottom fraction of the population with copies of the top
+    fraction, perturbing the copied hyper-parameters.
+
+    param population: List of Member objects, sorted best first
+    param fraction: Float, fraction of the population to replace
+    """
+    count = max(1, int(len(population) * fraction))
+    winners = population[:count]
+    losers = population[-count:]
+
+    for loser in losers:
+        winner = random.choice(winners)
+        loser.valueFunction = dict(winner.valueFunction)
+        loser.history = list(winner.history)
+        loser.learning = perturb(winner.learning)
+        loser.discount = perturb(winner.discount)
+        loser.epsilon = perturb(winner.epsilon)
+
+
+def pbt(populationSize=8, generations=15, interval=10000, evalGames=2, fraction=0.25, processes=None):
+    """
+    Runs population-based training.
+
+    param populationSize: Integer, number of agents in the population
+    param generations: Integer, number of train/evaluate/exploit rounds
+    param interval: Integer, training episodes per member per generation
+    param evalGames: Integer, round robin games per pairing and seat
+    param fraction: Float, fraction of the population replaced each round
+    param processes: Integer or None, worker processes (None: all cores)
+    return: Member object, the best member of the final population
+    """
+    population = []
+    for i in range(populationSize):
+        population.append(Member(i, random.uniform(0.5, 0.9), random.uniform(0.6, 0.95),
+                                 random.uniform(0.2, 0.9)))
+
+    with multiprocessing.Pool(processes) as pool:
+        for generation in range(generations):
+            partnerIndex = generation % len(PARTNERS)
+            jobs = [(member.valueFunction, member.learning, member.discount, member.epsilon,
+                     partnerIndex, interval, random.getrandbits(32)) for member in population]
+
+            for member, valueFunction in zip(population, pool.map(trainMember, jobs)):
+                member.valueFunction = valueFunction
+                member.history.append((generation, member.learning, member.discount, member.epsilon))
+
+            roundRobin(population, evalGames)
+            population.sort(key=lambda m: m.score, reverse=True)
+
+            best = population[0]
+            print(f"Generation {generation} ({PARTNERS[partnerIndex][0]}): best = Member {best.memberId}, "
+                  f"score = {best.score:.3f}, rate = {best.learning:.4f}, "
+                  f"dis_rate = {best.discount:.4f}, et_rate = {best.epsilon:.4f}")
+
+            if generation < generations - 1:
+                exploitAndExplore(population, fraction)
+
+    return population[0]
+
+
+if __name__ == "__main__":
+    best = pbt()
+    agent = best.createAgent('X')
+    agent.save()
+
+    print("Learned schedule (generation, learning rate, discount, epsilon):")
+    for step in best.history:
+        print(step)
@@ -0,0 +1,371 @@
+"""
+Declarative training pipeline.
+
+A JSON or TOML spec lists training stages (opponent, seat, episodes and
+hyper-parameters). Stages run in-process, so the agent stays in memory
+between stages instead of being handed over through the policy file.
+Stages that do not depend on each other run in parallel worker
+processes, and every finished stage is checkpointed, so an interrupted
+pipeline continues with the first unfinished stage.
+
+    python3 pipeline.py training_pipeline.json
+
+Spec layout (JSON; TOML uses the same keys):
+
+    {
+      "agent": {"letter": "X", "name": "RL Agent", "load": null,
+                "warmStart": {"scale": 1.0, "noise": 0.5}},
+      "checkpointDir": "pipeline_checkpoints",
+      "output": "cse_policy_hw2.txt",
+      "seed": 795623,
+      "processes": null,
+      "stages": [
+        {"name": "random", "opponent": "Random", "seat": "first", "episodes": 90000,
+         "learning": 0.79, "discount": 0.731, "epsilon": 0.801},
+        {"name": "minimax", "opponent": "minAndMAx", "seat": "second", "episodes": 40000,
+         "learning": 0.7911, "discount": 0.77, "epsilon": 0.781, "after": ["random"]}
+      ],
+      "evaluation": {"opponents": ["Random"], "games": 30}
+    }
+
+"warmStart" is optional and seeds the table from exact minimax values
+(see RLPlayer.warmStart); omit it to start from an empty table.
+
+A stage continues from the stage named in "after"; without "after" it
+continues from the stage listed before it. "after": [] starts from the
+initial agent.
+
+Instead of a single "opponent", a stage can train against a curriculum
+(see TicTacToe.Curriculum); "episodes" is then an upper bound and the
+stage ends early once every opponent is mastered:
+
+    {"name": "curriculum", "episodes": 200000, "seat": "both",
+     "learning": 0.79, "discount": 0.77, "epsilon": 0.3,
+     "curriculum": {"opponents": ["Random", "WinSeekingBot", "minAndMAx"],
+                    "window": 500, "mastery": 0.9, "poolSize": 2}}
+"""
+import json
+import multiprocessing
+import os
+import random
+import sys
+
+import TicTacToe as ttt
+
+OPPONENTS = {
+    'Random': ttt.Player,
+    'minAndMAx': ttt.minAndMAx,
+    'WinSeekingBot': ttt.WinSeekingBot,
+    'StrategicAgent': ttt.StrategicAgent,
+    'DiagonalWinBot': ttt.DiagonalWinBot,
+    'ForkPreventionBot': ttt.ForkPreventionBot,
+    'MCTSPlayer': ttt.MCTSPlayer,
+    'NegamaxPlayer': ttt.NegamaxPlayer,
+}
+
+STATE_FILE = 'pipeline_state.json'
+
+
+def loadSpec(path):
+    """
+    Reads a pipeline spec from a JSON or (by extension) TOML file.
+
+    param path: String
+    return: Dictionary
+    """
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as data:
+            return tomllib.load(data)
+
+    with open(path) as data:
+        return json.load(data)
+
+
+def stageParents(stages):
+    """
+    Works out the stage each stage continues from.
+
+    param stages: List of stage dictionaries
+    return: Dictionary {stage name: parent name or None}
+    """
+    parents = {}
+    previous = None
+
+    for stage in stages:
+        name = stage['name']
+        if name in parents:
+            raise ValueError(f'Duplicate stage name: {name}')
+
+        after = stage.get('after', [previous] if previous else [])
+        if len(after) > 1:
+            raise ValueError(f'Stage {name} can only continue from one stage, not {after}')
+        if after and after[0] not in parents:
+            raise ValueError(f'Stage {name} continues from unknown or later stage {after[0]}')
+
+        parents[name] = after[0] if after else None
+        previous = name
+
+    return parents
+
+
+def createOpponent(name, letter):
+    """
+    param name: String, a key of OPPONENTS
+    param letter: String, 'X' or 'O'
+    return: Player object
+    """
+    opponent = OPPONENTS[name](letter)
+    opponent.name = name
+    return opponent
+
+
+def trainStage(agent, stage, seed=None):
+    """
+    Trains an agent for one stage.
+
+    param agent: RLPlayer object
+    param stage: Dictionary, the stage spec
+    param seed: Integer or None, reseeds the random number generator
+    return: Integer, episodes played
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    agent.initTraining(stage['learning'], stage['discount'], stage['epsilon'])
+
+    if 'curriculum' in stage:
+        config = dict(stage['curriculum'])
+        opponents = [createOpponent(name, agent.opponent) for name in config.pop('opponents')]
+        curriculum = ttt.Curriculum(opponents, **config)
+        played = ttt.trainCurriculum(agent, curriculum, stage['episodes'], stage.get('seat', 'both'))
+        curriculum.printStats()
+        return played
+
+    opponent = createOpponent(stage['opponent'], agent.opponent)
+
+    if stage.get('seat', 'first') == 'first':
+        return ttt.train(agent, opponent, stage['episodes'])
+    return ttt.train(opponent, agent, stage['episodes'])
+
+
+def stageOpponents(stage):
+    """
+    param stage: Dictionary, the stage spec
+    return: String, the opponent or the curriculum's opponents
+    """
+    if 'curriculum' in stage:
+        return 'curriculum ' + ', '.join(stage['curriculum']['opponents'])
+    return stage['opponent']
+
+
+def runStageWorker(args):
+    """
+    Worker process entry point for stages run in parallel.
+
+    param args: Tuple (stage, agent, seed)
+    return: Tuple (trained RLPlayer object, episodes played)
+    """
+    stage, agent, seed = args
+    played = trainStage(agent, stage, seed)
+    return agent, played
+
+
+class Pipeline:
+    """
+    Runs the stages of a spec in dependency order.
+    """
+
+    def __init__(self, spec):
+        """
+        param spec: Dictionary, see the module documentation
+        """
+        self.spec = spec
+        self.stages = spec['stages']
+        self.parents = stageParents(self.stages)
+        self.checkpointDir = spec.get('checkpointDir', 'pipeline_checkpoints')
+        self.seed = spec.get('seed')
+        self.agents = {}
+        self.done = []
+
+    def stageSeed(self, stage):
+        if self.seed is None:
+            return None
+        return self.seed + self.stages.index(stage)
+
+    def checkpointFile(self, name):
+        return os.path.join(self.checkpointDir, f'{name}.checkpoint.json')
+
+    def createAgent(self):
+        """
+        Creates the initial agent, optionally from a saved policy and/or
+        warm-started from solved game values.
+
+        return: RLPlayer object
+        """
+        config = self.spec.get('agent', {})
+        agent = ttt.RLPlayer(config.get('letter', 'X'))
+        agent.name = config.get('name', 'RL Agent')
+        if config.get('load'):
+            agent._load(config['load'])
+        if config.get('warmStart'):
+            agent.warmStart(**config['warmStart'])
+        return agent
+
+    def restore(self):
+        """
+        Loads the stages finished by an earlier, interrupted run.
+        """
+        stateFile = os.path.join(self.checkpointDir, STATE_FILE)
+        if not os.path.exists(stateFile):
+            return
+
+        with open(stateFile) as data:
+            finished = json.load(data)['finished']
+
+        for name in finished:
+            if name in self.parents:
+                # The initial agent brings the settings a checkpoint does
+                # not hold, such as the reward scheme
+                agent = self.createAgent()
+                ttt.loadCheckpoint(self.checkpointFile(name), agent)
+                self.agents[name] = agent
+                self.done.append(name)
+                print(f'Stage {name}: restored from checkpoint')
+
+    def checkpoint(self, name, played):
+        """
+        Saves a finished stage, with the whole learning state of its
+        agent (see TicTacToe.Checkpointer), and records it as finished.
+
+        param name: String
+        param played: Integer, episodes the stage played
+        """
+        ttt.Checkpointer(self.checkpointFile(name)).write(played, self.agents[name])
+        self.done.append(name)
+
+        stateFile = os.path.join(self.checkpointDir, STATE_FILE)
+        with open(stateFile + '.tmp', 'w') as out:
+            json.dump({'finished': self.done}, out)
+        os.replace(stateFile + '.tmp', stateFile)
+
+    def startingAgent(self, name, pending):
+        """
+        Returns the agent a stage starts from: the parent's agent itself
+        when no other pending stage needs it, otherwise a copy of its
+        whole learning state (see RLPlayer.clone).
+
+        param name: String, the stage
+        param pending: List of stage names not yet run
+        return: RLPlayer object
+        """
+        parent = self.parents[name]
+        if parent is None:
+            source = self.createAgent()
+            if sum(1 for other in pending if self.parents[other] is None) <= 1:
+                return source
+        else:
+            source = self.agents[parent]
+            if sum(1 for other in pending if self.parents[other] == parent) <= 1:
+                return source
+
+        return source.clone()
+
+    def run(self):
+        """
+        Runs every unfinished stage.
+
+        return: Dictionary {stage name: RLPlayer object}
+        """
+        os.makedirs(self.checkpointDir, exist_ok=True)
+        self.restore()
+
+        pending = [stage['name'] for stage in self.stages if stage['name'] not in self.done]
+        byName = {stage['name']: stage for stage in self.stages}
+        pool = None
+
+        try:
+            while pending:
+                ready = [name for name in pending if self.parents[name] is None or self.parents[name] in self.done]
+                starts = {name: self.startingAgent(name, pending) for name in ready}
+                played = {}
+
+                if len(ready) == 1:
+                    name = ready[0]
+                    played[name] = trainStage(starts[name], byName[name], self.stageSeed(byName[name]))
+                    print(f'Stage {name}: {played[name]} episodes against {stageOpponents(byName[name])}')
+                else:
+                    if pool is None:
+                        pool = multiprocessing.Pool(self.spec.get('processes'))
+                    jobs = [(byName[name], starts[name], self.stageSeed(byName[name])) for name in ready]
+                    for name, (agent, episodes) in zip(ready, pool.map(runStageWorker, jobs)):
+                        starts[name] = agent
+                        played[name] = episodes
+                        print(f'Stage {name}: {played[name]} episodes against '
+                              f'{stageOpponents(byName[name])} (parallel)')
+
+                for name in ready:
+                    self.agents[name] = starts[name]
+                    self.checkpoint(name, played[name])
+                    pending.remove(name)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self.agents
+
+    def leaves(self):
+        """
+        Returns the stages no other stage continues from.
+
+        return: List of stage names
+        """
+        parents = set(self.parents.values())
+        return [stage['name'] for stage in self.stages if stage['name'] not in parents]
+
+    def evaluate(self):
+        """
+        Plays the agents of the final stages against the evaluation
+        opponents in both seats and prints the results.
+        """
+        evaluation = self.spec.get('evaluation')
+        if not evaluation:
+            return
+
+        for name in self.leaves():
+            agent = self.agents[name]
+            agent.setMode(ttt.PLAYING_MODE)
+            players = [agent]
+            tournament = ttt.Tournament()
+
+            for opponentName in evaluation.get('opponents', ['Random']):
+                opponent = createOpponent(opponentName, agent.opponent)
+                tournament.start(agent, opponent, evaluation.get('games', 30))
+                tournament.start(opponent, agent, evaluation.get('games', 30))
+                players.append(opponent)
+
+            print(f'Evaluation of stage {name}:')
+            tournament.printStats(players)
+
+
+def runPipeline(spec):
+    """
+    Runs a pipeline spec, saves the final policy and evaluates it.
+
+    param spec: Dictionary
+    return: Pipeline object
+    """
+    pipeline = Pipeline(spec)
+    pipeline.run()
+
+    leaves = pipeline.leaves()
+    if spec.get('output') and len(leaves) == 1:
+        pipeline.agents[leaves[0]].save(spec['output'])
+
+    pipeline.evaluate()
+    return pipeline
+
+
+if __name__ == "__main__":
+    runPipeline(loadSpec(sys.argv[1] if len(sys.argv) > 1 else 'training_pipeline.json'))
@@ -0,0 +1,199 @@
+"""
+Self-play training with parallel actors and a central learner.
+
+One value table plays both seats. Keys are taken from the perspective of
+the player to move (L for its own letter, T for the other), so X and O
+share every entry of the table and no scripted partner is needed.
+Actor processes play games with the latest copy of the table they have
+received and stream the afterstate trajectories to the learner over a
+queue. The learner applies the TD updates and regularly broadcasts a
+fresh copy of the table back to the actors.
+
+    python3 selfplay.py [episodes] [actors]
+"""
+import multiprocessing
+import queue
+import random
+import sys
+
+import TicTacToe as ttt
+
+
+def gameReward(learner, winner, trajectories, letter):
+    """
+    Returns the reward of a game from the learner's reward scheme.
+
+    param learner: RLPlayer object
+    param winner: String or None, letter of the winner, None for a draw
+    param trajectories: Dictionary {letter: afterstate keys}, of both players
+    param letter: String, the letter the reward is for
+    return: Float
+    """
+    scheme = learner.rewardScheme or ttt.defaultRewardScheme()
+    return scheme.reward(ttt.finalKey(trajectories, winner, letter))
+
+
+def createSelfPlayers(valueFunction, epsilon):
+    """
+    Creates the two seats of a self-play game, sharing one value table.
+
+    param valueFunction: Dictionary
+    param epsilon: Float (0..1), exploration rate of both seats
+    return: Tuple (RLPlayer for X, RLPlayer for O)
+    """
+    first = ttt.RLPlayer('X')
+    second = ttt.RLPlayer('O')
+    for player in (first, second):
+        player.initTraining(0.0, 0.0, epsilon)
+        player.valueFunction = valueFunction
+    return first, second
+
+
+def playGame(first, second):
+    """
+    Plays one self-play game.
+
+    return: Tuple (winner letter or None, {letter: afterstate keys})
+    """
+    winner, trajectories = ttt.selfPlayEpisode(first, second)
+    return (winner.letter if winner else None), trajectories
+
+
+def learn(learner, winner, trajectories):
+    """
+    Applies the TD updates of one game to the learner's table.
+
+    param learner: RLPlayer object
+    param winner: String or None
+    param trajectories: Dictionary {letter: afterstate keys}
+    """
+    for letter, keys in trajectories.items():
+        learner.learnFromTrajectory(keys, gameReward(learner, winner, trajectories, letter))
+
+
+def actor(actorId, tables, trajectories, episodes, epsilon, batchSize, seed):
+    """
+    Actor process entry point: plays self-play games and sends their
+    trajectories to the learner in batches.
+
+    param actorId: Integer
+    param tables: multiprocessing.Queue, value tables from the learner
+    param trajectories: multiprocessing.Queue, to the learner
+    param episodes: Integer, games to play
+    param epsilon: Float (0..1)
+    param batchSize: Integer, games per message
+    param seed: Integer
+    """
+    random.seed(seed)
+    first, second = createSelfPlayers({}, epsilon)
+    batch = []
+
+    for _ in range(episodes):
+        # Only the latest broadcast matters
+        try:
+            while True:
+                first.valueFunction = second.valueFunction = tables.get_nowait()
+        except queue.Empty:
+            pass
+
+        batch.append(playGame(first, second))
+        if len(batch) == batchSize:
+            trajectories.put((actorId, batch))
+            batch = []
+
+    if batch:
+        trajectories.put((actorId, batch))
+    trajectories.put((actorId, None))
+
+
+def selfPlay(episodes, actors=4, learning=0.2, discount=0.9, epsilon=0.1, broadcastEvery=1000, batchSize=50,
+             seed=None, rewardScheme=None):
+    """
+    Trains a value table by self-play.
+
+    param episodes: Integer, games in total
+    param actors: Integer, actor processes; 0 plays in this process, with
+            the learner's own table, which is reproducible
+    param learning: Float (0..1)
+    param discount: Float (0..1)
+    param epsilon: Float (0..1), exploration rate of the actors
+    param broadcastEvery: Integer, games learned between two table broadcasts
+    param batchSize: Integer, games per actor message
+    param seed: Integer or None
+    param rewardScheme: RewardScheme object or None for the default
+    return: RLPlayer object, the learner
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    learner = ttt.RLPlayer('X')
+    learner.name = 'Self-play Agent'
+    learner.initTraining(learning, discount, epsilon)
+    learner.rewardScheme = rewardScheme
+
+    if actors == 0:
+        first, second = createSelfPlayers(learner.valueFunction, epsilon)
+        for _ in range(episodes):
+            learn(learner, *playGame(first, second))
+        return learner
+
+    tables = [multiprocessing.Queue() for _ in range(actors)]
+    trajectories = multiprocessing.Queue()
+    processes = []
+
+    for actorId in range(actors):
+        share = episodes // actors + (1 if actorId < episodes % actors else 0)
+        process = multiprocessing.Process(target=actor, args=(actorId, tables[actorId], trajectories, share,
+                                                              epsilon, batchSize, random.getrandbits(32)))
+        process.start()
+        processes.append(process)
+
+    running = set(range(actors))
+    learned = 0
+    sinceBroadcast = 0
+
+    while running:
+        actorId, batch = trajectories.get()
+        if batch is None:
+            running.discard(actorId)
+            continue
+
+        for winner, game in batch:
+            learn(learner, winner, game)
+        learned += len(batch)
+        sinceBroadcast += len(batch)
+
+        if sinceBroadcast >= broadcastEvery:
+            snapshot = dict(learner.valueFunction)
+            for i in running:
+                tables[i].put(snapshot)
+            sinceBroadcast = 0
+            print(f'Learned {learned} games, {len(learner.valueFunction)} states')
+
+    for process in processes:
+        process.join()
+
+    # Actors may finish without reading the last broadcast
+    for table in tables:
+        table.cancel_join_thread()
+
+    return learner
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    actors = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    agent = selfPlay(episodes, actors, seed=ttt.RANDOM_NUMBER_SEED)
+    agent.save()
+
+    agent.setMode(ttt.PLAYING_MODE)
+    players = [agent]
+    tournament = ttt.Tournament()
+    for name, opponentClass in [('Random', ttt.Player), ('minAndMAx', ttt.minAndMAx)]:
+        opponent = opponentClass(agent.opponent)
+        opponent.name = name
+        tournament.start(agent, opponent, 30)
+        tournament.start(opponent, agent, 30)
+        players.append(opponent)
+    tournament.printStats(players)
@@ -33,22 +33,15 @@ def main():
 
 
 def epoch_2():
-    # 创建一个RLPlayer
-    import subprocess
-    subprocess.run(["python3", "training.py"])
+    # Run the training sessions of training.py in this process
+    # 在当前进程中运行 training.py 的训练
+    import pipeline
+    pipeline.runPipeline(pipeline.loadSpec('training_pipeline.json'))
 
 
 if __name__ == '__main__':
-    from time import sleep
-    from tqdm import tqdm
-    # main的进度条
-    for i in tqdm(range(100)):
-        sleep(0.01)
     epoch_2()
     print("epoch_2训练完成")
-    # epoch_2的进度条
-    for i in tqdm(range(100)):
-        sleep(0.01)
     main()
     print("训练完成")
     exit(1)
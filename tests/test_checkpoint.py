@@ -0,0 +1,68 @@
+import json
+import os
+import random
+
+import pytest
+
+import TicTacToe as ttt
+
+
+def run(episodes, checkpointer=None, resume=None):
+    agent = ttt.RLPlayer('X')
+    if resume is None:
+        random.seed(5)
+        agent.initTraining(0.3, 0.9, 0.3)
+    ttt.train(agent, ttt.StrategicAgent('O'), episodes, checkpointer=checkpointer, resume=resume)
+    return agent
+
+
+def tableFiles(path):
+    directory, base = os.path.split(path)
+    return sorted(name for name in os.listdir(directory) if name.startswith(base + '.'))
+
+
+def test_resume_continues_with_new_generation(tmp_path):
+    path = str(tmp_path / 'ck.json')
+    full = run(2000)
+
+    run(1300, ttt.Checkpointer(path, everyEpisodes=300, compactEvery=4))
+    generation = json.load(open(path))['table']['generation']
+
+    # Resume and write a single checkpoint
+    checkpointer = ttt.Checkpointer(path, everyEpisodes=300, compactEvery=4)
+    assert checkpointer.generation == generation
+    run(1500, checkpointer, resume=path)
+
+    table = json.load(open(path))['table']
+    assert table == {'generation': generation + 1, 'deltaBytes': 0}
+    assert tableFiles(path) == [f'ck.json.delta.{generation + 1}', f'ck.json.table.{generation + 1}']
+
+    resumed = run(2000, resume=path)
+    assert resumed.valueFunction == full.valueFunction
+    assert resumed.visitCounts == full.visitCounts
+
+
+def test_crash_before_checkpoint_replace_keeps_old_checkpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ck.json')
+    full = run(2000)
+
+    run(1300, ttt.Checkpointer(path, everyEpisodes=300, compactEvery=4))
+    before = open(path).read()
+
+    # Resume, write the new snapshot, then crash before the checkpoint file is replaced
+    replace = os.replace
+
+    def crashingReplace(source, target):
+        if target == path:
+            raise OSError('simulated crash')
+        replace(source, target)
+
+    monkeypatch.setattr(os, 'replace', crashingReplace)
+    with pytest.raises(OSError):
+        run(1500, ttt.Checkpointer(path, everyEpisodes=300, compactEvery=4), resume=path)
+    monkeypatch.setattr(os, 'replace', replace)
+
+    assert open(path).read() == before
+    resumed = run(2000, resume=path)
+    assert resumed.valueFunction == full.valueFunction
+    assert resumed.visitCounts == full.visitCounts
@@ -0,0 +1,46 @@
+import os
+
+import compact_policy
+import selfplay
+import TicTacToe as ttt
+
+
+def trainedPolicy(path):
+    agent = selfplay.selfPlay(3000, 0, seed=2)
+    agent.save(str(path))
+    return agent
+
+
+def test_writes_a_new_file_and_keeps_terminal_entries(tmp_path):
+    source = tmp_path / 'policy.txt'
+    agent = trainedPolicy(source)
+    original = source.read_bytes()
+
+    compact_policy.main([str(source)])
+
+    assert source.read_bytes() == original
+    compacted = ttt.RLPlayer('X')
+    compacted._load(str(tmp_path / 'policy.compact.txt'))
+    assert any(ttt.keyWinner(key) == 'L' for key in compacted.valueFunction)
+    assert compacted.exportPolicy() == agent.exportPolicy()
+
+
+def test_drop_terminal_needs_sparse_mode(tmp_path):
+    source = tmp_path / 'policy.txt'
+    trainedPolicy(source)
+    output = tmp_path / 'dropped.txt'
+
+    compact_policy.main([str(source), str(output), '--drop-terminal'])
+
+    compacted = ttt.RLPlayer('X')
+    compacted._load(str(output))
+    assert not any(ttt.defaultRewardScheme().terminal[ttt.stateId(key)] for key in compacted.valueFunction)
+    assert sorted(os.listdir(tmp_path)) == ['dropped.txt', 'policy.txt']
+
+    # X to move with two in a row: only sparse mode takes the win
+    board = ttt.TicTacToe()
+    for location, letter in [(0, 'X'), (3, 'O'), (1, 'X'), (4, 'O')]:
+        board.makeMove(location, letter)
+    compacted.setSparse()
+    compacted.getRLMove(board)
+    assert board.isGameWon('X')
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import TicTacToe as ttt
+
+STRATEGIES = [ttt.EXPLORE_EPSILON, ttt.EXPLORE_DECAYING_EPSILON, ttt.EXPLORE_UCB]
+
+
+def playedStates(agent):
+    return sum(1 for count in agent.visitCounts if count)
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_train_counts_the_afterstates_played(strategy):
+    random.seed(11)
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.3, 0.9, 0.3)
+    agent.setExploration(strategy)
+    opponent = ttt.Player('O')
+
+    ttt.train(agent, opponent, 100)
+    early = playedStates(agent)
+    ttt.train(agent, opponent, 400)
+
+    assert early > 10
+    assert playedStates(agent) > early
+    # One opening move per episode, the empty board is updated once per episode
+    openings = [ttt.stateId('*' * i + 'L' + '*' * (8 - i)) for i in range(9)]
+    assert sum(agent.visitCounts[state] for state in openings) == 500
+    assert agent.visitCounts[ttt.stateId('*' * 9)] == 500
+
+
+def test_ucb_tries_every_opening():
+    random.seed(12)
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.3, 0.9, 0.0)
+    agent.setExploration(ttt.EXPLORE_UCB)
+
+    ttt.train(agent, ttt.Player('O'), 50)
+
+    assert all(agent.visitCounts[ttt.stateId('*' * i + 'L' + '*' * (8 - i))] for i in range(9))
+
+
+def test_decaying_epsilon_explores_less_in_known_states():
+    random.seed(13)
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.3, 0.9, 1.0)
+    agent.setExploration(ttt.EXPLORE_DECAYING_EPSILON, epsilonDecay=10)
+    board = ttt.TicTacToe()
+
+    before = agent.afterstateVisits(board)[1]
+    ttt.train(agent, ttt.Player('O'), 200)
+    after = agent.afterstateVisits(board)[1]
+
+    assert before == 0
+    assert after == 200
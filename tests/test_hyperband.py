@@ -0,0 +1,16 @@
+import os
+
+import hyperband
+import TicTacToe as ttt
+
+
+def test_calls_do_not_share_results_or_checkpoints(tmp_path):
+    partner = ttt.Player('O')
+    first = hyperband.hyperband(partner, 90, 10, evalGames=2, checkpointDir=str(tmp_path))
+    second = hyperband.hyperband(partner, 90, 10, evalGames=2, checkpointDir=str(tmp_path))
+
+    assert len(first) == len(second) == 3
+    assert not set(first) & set(second)
+    runs = os.listdir(tmp_path)
+    assert len(runs) == 2
+    assert all(len(os.listdir(tmp_path / run)) == 9 + 5 + 3 for run in runs)
@@ -0,0 +1,81 @@
+import pytest
+
+import pipeline
+import TicTacToe as ttt
+
+
+STAGE = {'learning': 0.5, 'discount': 0.9, 'epsilon': 0.3}
+
+
+class UCBPipeline(pipeline.Pipeline):
+    def createAgent(self):
+        agent = super().createAgent()
+        agent.setExploration(ttt.EXPLORE_UCB, ucbConstant=3.0, learningRateByVisits=True)
+        agent.rewardScheme = ttt.RewardScheme('none', win=10, loss=-10, draw=1)
+        return agent
+
+
+def spec(tmp_path):
+    return {
+        'checkpointDir': str(tmp_path),
+        'seed': 7,
+        'processes': 2,
+        'stages': [
+            dict(STAGE, name='base', opponent='Random', episodes=300),
+            dict(STAGE, name='random', opponent='Random', episodes=200, after=['base']),
+            dict(STAGE, name='curriculum', episodes=5000, after=['base'], seat='first',
+                 curriculum={'opponents': ['Random'], 'window': 50, 'mastery': 0.5}),
+        ],
+    }
+
+
+def test_parallel_stages_keep_the_agent_state(tmp_path, capsys):
+    runner = UCBPipeline(spec(tmp_path))
+    agents = runner.run()
+    output = capsys.readouterr().out
+
+    base = runner.agents['base']
+    for name in ('random', 'curriculum'):
+        stage = next(stage for stage in runner.stages if stage['name'] == name)
+        expected = base.clone()
+        played = pipeline.trainStage(expected, stage, runner.stageSeed(stage))
+
+        agent = agents[name]
+        assert agent.exploration == ttt.EXPLORE_UCB
+        assert agent.ucbConstant == 3.0
+        assert agent.learningRateByVisits
+        assert agent.rewardScheme.win == 10
+        assert agent.valueFunction == expected.valueFunction
+        assert agent.visitCounts == expected.visitCounts
+        assert f'Stage {name}: {played} episodes' in output
+
+    assert 'Stage curriculum: 5000 episodes' not in output
+
+
+def test_resumed_pipeline_equals_an_uninterrupted_run(tmp_path, monkeypatch):
+    uninterrupted = UCBPipeline(spec(tmp_path / 'full')).run()
+
+    # Crash once the first stage is checkpointed
+    checkpoint = pipeline.Pipeline.checkpoint
+
+    def crashingCheckpoint(self, name, played):
+        if self.done:
+            raise OSError('simulated crash')
+        checkpoint(self, name, played)
+
+    monkeypatch.setattr(pipeline.Pipeline, 'checkpoint', crashingCheckpoint)
+    with pytest.raises(OSError):
+        UCBPipeline(spec(tmp_path / 'resumed')).run()
+    monkeypatch.setattr(pipeline.Pipeline, 'checkpoint', checkpoint)
+
+    runner = UCBPipeline(spec(tmp_path / 'resumed'))
+    agents = runner.run()
+
+    assert runner.done[0] == 'base'
+    for name, agent in agents.items():
+        expected = uninterrupted[name]
+        assert agent.exploration == ttt.EXPLORE_UCB
+        assert agent.learningRateByVisits
+        assert agent.rewardScheme.win == 10
+        assert agent.valueFunction == expected.valueFunction
+        assert agent.visitCounts == expected.visitCounts
@@ -0,0 +1,37 @@
+import random
+
+import league
+import selfplay
+import TicTacToe as ttt
+
+
+def doubledScheme():
+    return ttt.RewardScheme(win=2 * ttt.WIN_REWARD, loss=2 * ttt.LOSS_REWARD, draw=2 * ttt.DRAW_REWARD)
+
+
+def doubled(valueFunction):
+    return {key: 2 * value for key, value in valueFunction.items()}
+
+
+def test_self_play_uses_the_learner_reward_scheme():
+    default = selfplay.selfPlay(500, 0, seed=1)
+    scaled = selfplay.selfPlay(500, 0, seed=1, rewardScheme=doubledScheme())
+
+    assert scaled.valueFunction == doubled(default.valueFunction)
+
+
+def test_league_uses_the_agent_reward_scheme(tmp_path):
+    tables = []
+    for scheme in (None, doubledScheme()):
+        random.seed(2)
+        agent = ttt.RLPlayer('X')
+        agent.initTraining(0.2, 0.9, 0.1)
+        agent.rewardScheme = scheme
+        trainer = league.League(agent, snapshotEvery=100, matchGames=20, matchesPerRound=2, processes=2,
+                                snapshotDir=str(tmp_path / str(len(tables))))
+        trainer.run(200)
+        trainer.close()
+        tables.append(agent.valueFunction)
+
+    assert any(value < 0 for value in tables[0].values())
+    assert tables[1] == doubled(tables[0])
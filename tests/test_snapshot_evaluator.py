@@ -0,0 +1,30 @@
+import multiprocessing
+
+import TicTacToe as ttt
+
+
+def test_context_manager_collects_curve_and_shuts_down_pool():
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.5, 0.9, 0.3)
+
+    with ttt.SnapshotEvaluator([('Random', ttt.Player)], games=5, every=100) as evaluator:
+        ttt.train(agent, ttt.Player('O'), 300, evaluator=evaluator)
+
+    assert sorted(evaluator.curve) == [100, 200, 300]
+    assert evaluator.pool is None
+    assert not multiprocessing.active_children()
+
+
+def test_context_manager_terminates_pool_on_error():
+    agent = ttt.RLPlayer('X')
+    agent.initTraining(0.5, 0.9, 0.3)
+
+    try:
+        with ttt.SnapshotEvaluator([('Random', ttt.Player)], games=5, every=100) as evaluator:
+            ttt.train(agent, ttt.Player('O'), 100, evaluator=evaluator)
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+
+    assert evaluator.pool is None
+    assert not multiprocessing.active_children()
@@ -0,0 +1,36 @@
+import time
+
+import TicTacToe as ttt
+
+
+class SlowPlayer(ttt.Player):
+    """
+    Plays randomly after sleeping for a given time per move.
+    """
+
+    def __init__(self, letter, delays):
+        super().__init__(letter)
+        self.delays = delays
+        self.moves = 0
+
+    def makeMove(self, board):
+        time.sleep(self.delays[min(self.moves, len(self.delays) - 1)])
+        self.moves += 1
+        super().makeMove(board)
+
+
+def play(tournament, player):
+    opponent = ttt.Player('O')
+    tournament.start(player, opponent, 1)
+    return tournament.forfeits.get(player, 0)
+
+
+def test_game_time_only_forfeits_when_the_clock_runs_out():
+    # The first move takes far more than an even share of the clock
+    assert play(ttt.Tournament(gameTime=0.5), SlowPlayer('X', [0.2, 0.01])) == 0
+    assert play(ttt.Tournament(gameTime=0.1), SlowPlayer('X', [0.06])) == 1
+
+
+def test_move_time_forfeits_a_slow_move():
+    assert play(ttt.Tournament(moveTime=0.2), SlowPlayer('X', [0.01])) == 0
+    assert play(ttt.Tournament(moveTime=0.05), SlowPlayer('X', [0.01, 0.1])) == 1
@@ -0,0 +1,50 @@
+import random
+
+import TicTacToe as ttt
+
+
+def test_learners_use_their_own_reward_scheme():
+    random.seed(3)
+    learners = []
+    for scheme in (None, ttt.RewardScheme(win=2 * ttt.WIN_REWARD, loss=2 * ttt.LOSS_REWARD,
+                                          draw=2 * ttt.DRAW_REWARD)):
+        learner = ttt.RLPlayer('X')
+        learner.initTraining(0.5, 0.9, 0.3)
+        learner.rewardScheme = scheme
+        learners.append(learner)
+
+    ttt.trainShared(learners, ttt.Player('O'), 500)
+
+    default, doubled = learners
+    assert any(value > 0 for value in default.valueFunction.values())
+    assert any(value < 0 for value in default.valueFunction.values())
+    assert doubled.valueFunction == {key: 2 * value for key, value in default.valueFunction.items()}
+
+
+def test_rewards_match_the_game_result(monkeypatch):
+    random.seed(4)
+    learner = ttt.RLPlayer('X')
+    learner.initTraining(1.0, 0.0, 0.3)
+    learner.rewardScheme = ttt.RewardScheme('none', win=1, loss=-1, draw=0)
+
+    expected = []
+    selfPlayEpisode = ttt.selfPlayEpisode
+
+    def recordingEpisode(player1, player2):
+        winner, trajectories = selfPlayEpisode(player1, player2)
+        expected.append(0 if winner is None else (1 if winner is learner else -1))
+        return winner, trajectories
+
+    rewards = []
+    learnFromTrajectory = learner.learnFromTrajectory
+
+    def recordingLearn(keys, reward):
+        rewards.append(reward)
+        learnFromTrajectory(keys, reward)
+
+    monkeypatch.setattr(ttt, 'selfPlayEpisode', recordingEpisode)
+    learner.learnFromTrajectory = recordingLearn
+    ttt.trainShared([learner], ttt.Player('O'), 300)
+
+    assert set(expected) == {1, -1, 0}
+    assert rewards == expected